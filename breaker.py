@@ -0,0 +1,86 @@
+import random
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# Stops calling a dependency once enough recent calls failed or ran slow, then
+# lets a single probe through after a cooldown to see if it has recovered
+class CircuitBreaker:
+    def __init__(self, window: int = 20, min_calls: int = 10, error_rate: float = 0.5,
+                 slow_call: float = 2.0, slow_rate: float = 0.5, cooldown: float = 30.0):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.cooldown = cooldown
+        # (failed, slow) for the most recent calls
+        self.calls: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.cooldown
+
+    # Whether a call would be let through right now; doesn't claim the probe
+    def available(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self._cooled_down()
+        return not self._probing
+
+    # Claim permission for one call; every allowed call must end in record() or release()
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self._cooled_down():
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, failed: bool, seconds: float):
+        slow = seconds >= self.slow_call
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if failed or slow:
+                self._trip()
+            else:
+                self.state = CLOSED
+                self.calls.clear()
+            return
+        if self.state == OPEN:
+            # A call that started before the trip finished late
+            return
+
+        self.calls.append((failed, slow))
+        if len(self.calls) < self.min_calls:
+            return
+        failures = sum(f for f, _ in self.calls) / len(self.calls)
+        slows = sum(s for _, s in self.calls) / len(self.calls)
+        if failures >= self.error_rate or slows >= self.slow_rate:
+            self._trip()
+
+    # An allowed call ended without an outcome (it was cancelled)
+    def release(self):
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def _trip(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.calls.clear()
+        self.trips += 1
+
+
+# Exponential backoff with full jitter, so retries from many tasks spread out
+def backoff(attempt: int, base: float, cap: float) -> float:
+    return random.uniform(0, min(cap, base * 2 ** attempt))
@@ -0,0 +1,269 @@
+import random
+from array import array
+from dataclasses import dataclass
+
+HEAD = "<:limbus_heads:1463921098394439774>"
+TAIL = "<:limbus_tails:1463921048704647188>"
+UNBREAKABLE_HEAD = "<:limbus_unbreakable_heads:1463921190228721684>"
+UNBREAKABLE_TAIL = "<:limbus_unbreakable_tails:1463921283946512566>"
+MAX_SANITY = 45
+MIN_SANITY = -45
+
+# Trail emoji per (unbreakable, heads). Normal coins keep the art /flip_skill
+# and /clash have always shown for them.
+COIN_EMOJI = {
+    (False, True): TAIL,
+    (False, False): HEAD,
+    (True, True): UNBREAKABLE_HEAD,
+    (True, False): UNBREAKABLE_TAIL,
+}
+# COIN_TRAIL[unbreakable][heads] -> trail segment
+COIN_TRAIL = tuple(
+    tuple(COIN_EMOJI[(unbreakable, heads)] + " " for heads in (False, True))
+    for unbreakable in (False, True)
+)
+# Rows of more coins are shown as a count per face: each emoji is ~45
+# characters, and a clash step holds two rows in a 2000 character message
+TRAIL_MAX_COINS = 15
+
+# Safety net for skills that can only ever tie (e.g. equal base, 0 coin power)
+MAX_CLASH_STEPS = 500
+# Most coins a skill may have; keeps /clash_odds' exact solver and simulation bounded
+MAX_COINS = 50
+# Largest TTRPG die (either sign)
+MAX_DICE = 1000
+
+# Simulated clashes per /clash_odds request (see clash_odds.py)
+DEFAULT_TRIALS = 100_000
+MAX_TRIALS = 1_000_000
+
+
+def clamp_sanity(sanity: int) -> int:
+    return max(MIN_SANITY, min(MAX_SANITY, sanity))
+
+# ----------------------
+# Limbus Clash Rules
+# ----------------------
+
+@dataclass(frozen=True)
+class SkillSpec:
+    base_power: int
+    coin_power: int
+    coins: int
+    unbreakable: int = 0
+
+    @property
+    def normal_coins(self) -> int:
+        return max(0, self.coins - self.unbreakable)
+
+
+# One flip of a row of coins; normal coins always come before unbreakables
+@dataclass(frozen=True)
+class CoinFlip:
+    normal: int
+    heads: tuple[bool, ...]
+    total: int
+
+    @property
+    def head_count(self) -> int:
+        return sum(self.heads)
+
+    @property
+    def trail(self) -> str:
+        if len(self.heads) > TRAIL_MAX_COINS:
+            return self.counted_trail
+        normal_trail, unbreakable_trail = COIN_TRAIL
+        return "".join(
+            [normal_trail[head] for head in self.heads[:self.normal]]
+            + [unbreakable_trail[head] for head in self.heads[self.normal:]]
+        )
+
+    # "<emoji> ×n" per coin face that came up, normal coins first
+    @property
+    def counted_trail(self) -> str:
+        rows = ((False, self.heads[:self.normal]), (True, self.heads[self.normal:]))
+        return " ".join(
+            f"{COIN_EMOJI[(unbreakable, head)]} ×{row.count(head)}"
+            for unbreakable, row in rows for head in (True, False) if head in row
+        )
+
+
+@dataclass(frozen=True)
+class ClashStep:
+    number: int
+    flip1: CoinFlip
+    flip2: CoinFlip
+    # 1 or 2, None on a tie
+    loser: int | None
+
+
+@dataclass(frozen=True)
+class ClashResult:
+    steps: tuple[ClashStep, ...]
+    # 1 or 2, None for a stalemate: both sides still had coins at the step cap
+    # (a clash that can only tie), or neither had any to begin with
+    winner: int | None
+    # Winner flips its remaining coins plus any unbreakables it lost; None in a stalemate
+    winner_flip: CoinFlip | None
+    # Loser flips all of its unbreakables, if it has any
+    loser_flip: CoinFlip | None
+
+
+# Flip `coins` coins that each land heads with `head_chance`% probability.
+# All coins come from one getrandbits() call, read back as 32-bit lanes.
+def flip_heads(coins: int, head_chance: int, rng=random) -> tuple[bool, ...]:
+    threshold = (head_chance << 32) // 100
+    lanes = array("I", rng.getrandbits(32 * coins).to_bytes(4 * coins, "little"))
+    return tuple([lane < threshold for lane in lanes])
+
+
+# Flip `normal` normal coins followed by `unbreakable` unbreakable coins
+def flip_coins(skill: SkillSpec, normal: int, unbreakable: int, sanity: int, rng=random) -> CoinFlip:
+    heads = flip_heads(normal + unbreakable, 50 + sanity, rng)
+    return CoinFlip(normal, heads, skill.base_power + skill.coin_power * heads.count(True))
+
+
+# Run a full Limbus clash between two skills
+def run_clash(skill1: SkillSpec, sanity1: int, skill2: SkillSpec, sanity2: int, rng=None) -> ClashResult:
+    rng = rng or random.Random()
+    skills = (skill1, skill2)
+    sanities = (sanity1, sanity2)
+    # Remaining coins as counts; the leftmost coin is lost first, so normals go before unbreakables
+    normal = [skill1.normal_coins, skill2.normal_coins]
+    unbreakable = [skill1.unbreakable, skill2.unbreakable]
+    removed_unbreakable = [0, 0]
+    steps = []
+
+    while normal[0] + unbreakable[0] and normal[1] + unbreakable[1] and len(steps) < MAX_CLASH_STEPS:
+        flip1 = flip_coins(skill1, normal[0], unbreakable[0], sanity1, rng)
+        flip2 = flip_coins(skill2, normal[1], unbreakable[1], sanity2, rng)
+
+        if flip1.total > flip2.total:
+            loser = 2
+        elif flip2.total > flip1.total:
+            loser = 1
+        else:
+            loser = None
+
+        # Remove LEFTMOST coin from loser
+        if loser is not None:
+            i = loser - 1
+            if normal[i]:
+                normal[i] -= 1
+            else:
+                unbreakable[i] -= 1
+                removed_unbreakable[i] += 1
+
+        steps.append(ClashStep(len(steps) + 1, flip1, flip2, loser))
+
+    # Whoever alone still has coins wins; otherwise nobody can
+    left = (normal[0] + unbreakable[0] > 0, normal[1] + unbreakable[1] > 0)
+    if left[0] == left[1]:
+        return ClashResult(tuple(steps), None, None, None)
+    winner = 1 if left[0] else 2
+    w, l = winner - 1, 2 - winner
+
+    winner_flip = flip_coins(
+        skills[w], normal[w], unbreakable[w] + removed_unbreakable[w], sanities[w], rng
+    )
+    loser_flip = None
+    if skills[l].unbreakable > 0:
+        loser_flip = flip_coins(skills[l], 0, skills[l].unbreakable, sanities[l], rng)
+
+    return ClashResult(tuple(steps), winner, winner_flip, loser_flip)
+
+# ----------------------
+# TTRPG Clash Rules
+# ----------------------
+
+# (lowest sanity, highest sanity, base mod, dice mod) for positive dice;
+# negative dice get the reverse effects
+SANITY_BRACKETS = (
+    (-45, -41, -3, 2),
+    (-40, -21, -2, 2),
+    (-20, -1, -1, 1),
+    (0, 0, 0, 0),
+    (1, 20, 1, -1),
+    (21, 40, 2, -2),
+    (41, 45, 3, -2),
+)
+
+
+def _build_sanity_mod_table(sign: int) -> tuple[tuple[int, int], ...]:
+    table = []
+    for sanity in range(MIN_SANITY, MAX_SANITY + 1):
+        for low, high, base_mod, dice_mod in SANITY_BRACKETS:
+            if low <= sanity <= high:
+                table.append((sign * base_mod, sign * dice_mod))
+                break
+    return tuple(table)
+
+
+# SANITY_MOD_TABLE[negative dice][sanity - MIN_SANITY] -> (base mod, dice mod)
+SANITY_MOD_TABLE = (_build_sanity_mod_table(1), _build_sanity_mod_table(-1))
+
+
+@dataclass(frozen=True)
+class TtrpgRoll:
+    total: int
+    roll: int
+    mod_base: int
+    mod_dice: int
+
+
+@dataclass(frozen=True)
+class TtrpgClashResult:
+    roll1: TtrpgRoll
+    roll2: TtrpgRoll
+    # 1 or 2, None for a stalemate (still tied after MAX_CLASH_STEPS re-rolls)
+    winner: int | None
+    # How many tied rounds were re-rolled before a winner
+    rerolls: int
+
+    @property
+    def damage(self) -> int:
+        if self.winner is None:
+            return 0
+        return max(self.roll1.total, self.roll2.total)
+
+
+# Helper function to apply sanity effects
+def apply_sanity_mod(sanity: int, base_power: int, dice_power: int) -> tuple[int, int]:
+    if MIN_SANITY <= sanity <= MAX_SANITY:
+        base_mod, dice_mod = SANITY_MOD_TABLE[dice_power < 0][sanity - MIN_SANITY]
+    else:
+        base_mod, dice_mod = 0, 0
+
+    # Prevent dice from going below 1
+    return base_power + base_mod, max(1, abs(dice_power) + dice_mod)
+
+
+# Roll one TTRPG skill
+def roll_ttrpg(base_power: int, dice_power: int, sanity: int, rng=random) -> TtrpgRoll:
+    mod_base, mod_dice = apply_sanity_mod(sanity, base_power, dice_power)
+
+    dice_sign = 1 if dice_power >= 0 else -1
+    roll = rng.randint(1, abs(mod_dice))
+    total = mod_base + (dice_sign * roll)
+
+    return TtrpgRoll(total, roll, mod_base, mod_dice)
+
+
+# Roll both skills, re-rolling ties until someone wins or the re-roll cap is hit
+def run_clash_ttrpg(base1: int, dice1: int, sanity1: int,
+                    base2: int, dice2: int, sanity2: int, rng=None) -> TtrpgClashResult:
+    rng = rng or random.Random()
+    rerolls = 0
+    roll1 = roll_ttrpg(base1, dice1, sanity1, rng)
+    roll2 = roll_ttrpg(base2, dice2, sanity2, rng)
+
+    while roll1.total == roll2.total and rerolls < MAX_CLASH_STEPS:
+        rerolls += 1
+        roll1 = roll_ttrpg(base1, dice1, sanity1, rng)
+        roll2 = roll_ttrpg(base2, dice2, sanity2, rng)
+
+    if roll1.total == roll2.total:
+        winner = None
+    else:
+        winner = 1 if roll1.total > roll2.total else 2
+    return TtrpgClashResult(roll1, roll2, winner, rerolls)
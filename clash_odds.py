@@ -0,0 +1,336 @@
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from math import comb
+
+import numpy as np
+
+from clash_engine import (
+    DEFAULT_TRIALS, MAX_CLASH_STEPS, MAX_COINS, MAX_SANITY, MIN_SANITY, SANITY_MOD_TABLE,
+    SkillSpec, apply_sanity_mod
+)
+
+# Largest (coins1 + 1) * (coins2 + 1) DP grid solved exactly: two skills at the
+# coin cap take ~30 ms, but the solver is O(c1² · c2²), so skills saved before
+# the cap existed are simulated instead
+EXACT_MAX_STATES = (MAX_COINS + 1) ** 2
+
+# SANITY_MOD_TABLE as an array: [negative dice, sanity - MIN_SANITY, (base mod, dice mod)]
+SANITY_MOD_ARRAY = np.array(SANITY_MOD_TABLE, dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class ClashOdds:
+    # 0 for exact results
+    trials: int
+    # Probability that player 1 wins the clash
+    win_probability: float
+    # Probability that nobody wins (the clash can only tie, or neither side has coins)
+    draw_probability: float
+    mean_steps: float
+    # Mean post-clash power of each player over the trials they win
+    expected_power: float
+    expected_opponent_power: float
+    # Player 1's post-clash power when winning: {power: probability}
+    power_distribution: dict[int, float]
+
+
+# Simulated clashes per batch; the time budget is checked between batches
+SIMULATION_BATCH = 10_000
+# Seconds one simulation may run before it stops and reports the trials done so far
+SIMULATION_BUDGET = 0.2
+
+
+# Mask of the trials (given their coins left) stuck in a state where every step ties
+def _tie_only(skill1: SkillSpec, p1: float, skill2: SkillSpec, p2: float,
+              coins1: np.ndarray, coins2: np.ndarray) -> np.ndarray:
+    states, inverse = np.unique(np.stack([coins1, coins2], axis=1), axis=0, return_inverse=True)
+    stuck = np.array([
+        sum(_step_outcomes(skill1.base_power, skill1.coin_power, int(c1), p1,
+                           skill2.base_power, skill2.coin_power, int(c2), p2)) <= 1e-15
+        for c1, c2 in states
+    ])
+    return stuck[inverse.reshape(-1)]
+
+
+# One batch of clashes: (wins, draws, total steps, winning powers, opponent's winning powers)
+def _simulate_batch(rng, skill1: SkillSpec, p1: float, skill2: SkillSpec, p2: float, trials: int):
+    normal1 = np.full(trials, skill1.normal_coins, dtype=np.int64)
+    unbreakable1 = np.full(trials, skill1.unbreakable, dtype=np.int64)
+    removed1 = np.zeros(trials, dtype=np.int64)
+    normal2 = np.full(trials, skill2.normal_coins, dtype=np.int64)
+    unbreakable2 = np.full(trials, skill2.unbreakable, dtype=np.int64)
+    removed2 = np.zeros(trials, dtype=np.int64)
+    steps = np.zeros(trials, dtype=np.int64)
+
+    live = np.flatnonzero((normal1 + unbreakable1 > 0) & (normal2 + unbreakable2 > 0))
+    step = 0
+    while live.size and step < MAX_CLASH_STEPS:
+        total1 = skill1.base_power + skill1.coin_power * rng.binomial(normal1[live] + unbreakable1[live], p1)
+        total2 = skill2.base_power + skill2.coin_power * rng.binomial(normal2[live] + unbreakable2[live], p2)
+        steps[live] += 1
+
+        # Loser drops its leftmost coin: normals first, then unbreakables
+        for lost, normal, unbreakable, removed in (
+            (live[total2 > total1], normal1, unbreakable1, removed1),
+            (live[total1 > total2], normal2, unbreakable2, removed2),
+        ):
+            has_normal = normal[lost] > 0
+            normal[lost[has_normal]] -= 1
+            spent = lost[~has_normal]
+            unbreakable[spent] -= 1
+            removed[spent] += 1
+
+        # A tie from a state that can only tie repeats until the step cap and ends
+        # in a stalemate; settle those now instead of flipping on
+        tied = live[total1 == total2]
+        if tied.size:
+            stuck = tied[_tie_only(skill1, p1, skill2, p2,
+                                   normal1[tied] + unbreakable1[tied], normal2[tied] + unbreakable2[tied])]
+            steps[stuck] = MAX_CLASH_STEPS
+            live = np.setdiff1d(live, stuck, assume_unique=True)
+
+        live = live[(normal1[live] + unbreakable1[live] > 0) & (normal2[live] + unbreakable2[live] > 0)]
+        step += 1
+
+    # Whoever alone still has coins wins; otherwise it's a stalemate
+    left1 = normal1 + unbreakable1 > 0
+    left2 = normal2 + unbreakable2 > 0
+    won = left1 & ~left2
+    lost = left2 & ~left1
+    power1 = skill1.base_power + skill1.coin_power * rng.binomial(
+        normal1[won] + unbreakable1[won] + removed1[won], p1
+    )
+    power2 = skill2.base_power + skill2.coin_power * rng.binomial(
+        normal2[lost] + unbreakable2[lost] + removed2[lost], p2
+    )
+    return int(won.sum()), int((left1 == left2).sum()), int(steps.sum()), power1, power2
+
+
+# Monte Carlo over the /clash rules; each step flips every live trial at once.
+# Only the number of heads matters for a total, so each flip is one binomial draw.
+# Runs in batches and stops early once `budget` seconds have passed (None for no
+# limit), so `trials` in the result may be lower than asked for.
+def simulate_clash_odds(skill1: SkillSpec, sanity1: int, skill2: SkillSpec, sanity2: int,
+                        trials: int = DEFAULT_TRIALS, seed=None,
+                        budget: float | None = SIMULATION_BUDGET) -> ClashOdds:
+    rng = np.random.default_rng(seed)
+    p1 = (50 + sanity1) / 100
+    p2 = (50 + sanity2) / 100
+    started = time.perf_counter()
+    # Long clashes take more steps per trial, so use smaller batches to check the budget as often
+    batch_size = max(1000, SIMULATION_BATCH * 10 // max(10, skill1.coins + skill2.coins))
+
+    done = wins = draws = total_steps = 0
+    powers1, powers2 = [], []
+    while done < trials:
+        batch = min(batch_size, trials - done)
+        batch_wins, batch_draws, batch_steps, power1, power2 = _simulate_batch(
+            rng, skill1, p1, skill2, p2, batch
+        )
+        done += batch
+        wins += batch_wins
+        draws += batch_draws
+        total_steps += batch_steps
+        powers1.append(power1)
+        powers2.append(power2)
+        if budget is not None and time.perf_counter() - started > budget:
+            break
+
+    power1 = np.concatenate(powers1)
+    power2 = np.concatenate(powers2)
+    values, counts = np.unique(power1, return_counts=True)
+    return ClashOdds(
+        trials=done,
+        win_probability=wins / done,
+        draw_probability=draws / done,
+        mean_steps=total_steps / done,
+        expected_power=float(power1.mean()) if wins else 0.0,
+        expected_opponent_power=float(power2.mean()) if power2.size else 0.0,
+        power_distribution={int(v): c / wins for v, c in zip(values, counts)},
+    )
+
+
+# Percentile of a {value: probability} distribution
+def distribution_percentile(distribution: dict[int, float], q: float) -> int | None:
+    cumulative = 0.0
+    for value in sorted(distribution):
+        cumulative += distribution[value]
+        if cumulative >= q - 1e-12:
+            return value
+    return max(distribution) if distribution else None
+
+
+# Binomial pmf of the number of heads among `coins` flips
+@lru_cache(maxsize=4096)
+def _heads_pmf(coins: int, p: float) -> np.ndarray:
+    k = np.arange(coins + 1)
+    pmf = np.array([comb(coins, int(i)) for i in k], dtype=float) * p ** k * (1 - p) ** (coins - k)
+    pmf.setflags(write=False)
+    return pmf
+
+
+# Fill the coin pmf cache for every sanity, up to `max_coins` coins (startup warm-up)
+def warm_tables(max_coins: int = 8):
+    for coins in range(max_coins + 1):
+        for sanity in range(MIN_SANITY, MAX_SANITY + 1):
+            _heads_pmf(coins, (50 + sanity) / 100)
+
+
+# (P(player 1 wins the step), P(player 2 wins the step)) with c1 and c2 coins left
+@lru_cache(maxsize=65536)
+def _step_outcomes(base1: int, coin1: int, c1: int, p1: float,
+                   base2: int, coin2: int, c2: int, p2: float) -> tuple[float, float]:
+    total1 = base1 + coin1 * np.arange(c1 + 1)
+    total2 = base2 + coin2 * np.arange(c2 + 1)
+    joint = np.outer(_heads_pmf(c1, p1), _heads_pmf(c2, p2))
+    diff = total1[:, None] - total2[None, :]
+    return float(joint[diff > 0].sum()), float(joint[diff < 0].sum())
+
+
+# Whether exact_clash_odds() is cheap enough to run for these skills
+def exact_is_cheap(skill1: SkillSpec, skill2: SkillSpec) -> bool:
+    return (skill1.coins + 1) * (skill2.coins + 1) <= EXACT_MAX_STATES
+
+
+# Exact /clash odds. A DP over (coins left for player 1, coins left for player 2)
+# pushes probability mass toward the terminal states; tie steps re-flip the same
+# state, so they only rescale the outgoing mass. The winner's post-clash flip only
+# depends on how many coins it kept, because normals are always lost first.
+@lru_cache(maxsize=1024)
+def exact_clash_odds(skill1: SkillSpec, sanity1: int, skill2: SkillSpec, sanity2: int) -> ClashOdds:
+    p1 = (50 + sanity1) / 100
+    p2 = (50 + sanity2) / 100
+    coins1 = skill1.normal_coins + skill1.unbreakable
+    coins2 = skill2.normal_coins + skill2.unbreakable
+
+    mass = np.zeros((coins1 + 1, coins2 + 1))
+    mass[coins1, coins2] = 1.0
+    mean_steps = 0.0
+    # Neither side has coins, so nobody wins
+    stalemate = mass[0, 0]
+
+    # Every move lowers c1 + c2 by one, so sweep states by descending coin total
+    for left in range(coins1 + coins2, 0, -1):
+        for c1 in range(max(1, left - coins2), min(coins1, left - 1) + 1):
+            c2 = left - c1
+            m = mass[c1, c2]
+            if m == 0.0:
+                continue
+            win, lose = _step_outcomes(
+                skill1.base_power, skill1.coin_power, c1, p1,
+                skill2.base_power, skill2.coin_power, c2, p2
+            )
+            decisive = win + lose
+            if decisive <= 1e-15:
+                # Can only ever tie; the engine stops at its step cap with no winner
+                stalemate += m
+                mean_steps += m * MAX_CLASH_STEPS
+                continue
+            mean_steps += m / decisive
+            mass[c1, c2 - 1] += m * win / decisive
+            mass[c1 - 1, c2] += m * lose / decisive
+
+    def final_power(skill: SkillSpec, coins: int, p: float, end_mass: np.ndarray) -> dict[int, float]:
+        dist = {}
+        for kept, m in enumerate(end_mass):
+            if kept == 0 or m == 0.0:
+                continue
+            normal_left = max(0, skill.normal_coins - (coins - kept))
+            pmf = _heads_pmf(normal_left + skill.unbreakable, p)
+            for heads, q in enumerate(pmf):
+                power = skill.base_power + skill.coin_power * heads
+                dist[power] = dist.get(power, 0.0) + m * q
+        return dist
+
+    # Terminal states: player 1 wins in column 0, player 2 in row 0
+    win_probability = float(mass[1:, 0].sum())
+    dist1 = final_power(skill1, coins1, p1, mass[:, 0])
+    dist2 = final_power(skill2, coins2, p2, mass[0, :])
+
+    def mean(dist):
+        total = sum(dist.values())
+        return sum(v * q for v, q in dist.items()) / total if total else 0.0
+
+    def normalise(dist):
+        total = sum(dist.values())
+        return {v: q / total for v, q in sorted(dist.items())} if total else {}
+
+    return ClashOdds(
+        trials=0,
+        win_probability=win_probability,
+        draw_probability=float(stalemate),
+        mean_steps=mean_steps,
+        expected_power=mean(dist1),
+        expected_opponent_power=mean(dist2),
+        power_distribution=normalise(dist1),
+    )
+
+
+# Vectorized apply_sanity_mod over arrays of sanities and skills
+def apply_sanity_mod_array(sanity, base_power, dice_power) -> tuple[np.ndarray, np.ndarray]:
+    sanity = np.asarray(sanity, dtype=np.int64)
+    base_power = np.asarray(base_power, dtype=np.int64)
+    dice_power = np.asarray(dice_power, dtype=np.int64)
+
+    in_range = (sanity >= MIN_SANITY) & (sanity <= MAX_SANITY)
+    index = np.clip(sanity, MIN_SANITY, MAX_SANITY) - MIN_SANITY
+    mods = SANITY_MOD_ARRAY[(dice_power < 0).astype(np.int64), index] * in_range[..., None]
+
+    # Prevent dice from going below 1
+    return base_power + mods[..., 0], np.maximum(1, np.abs(dice_power) + mods[..., 1])
+
+
+@dataclass(frozen=True)
+class TtrpgOdds:
+    # Win probabilities after tie re-rolls; they sum to 1 unless every roll ties
+    win_probability: float
+    opponent_win_probability: float
+    # Chance a single pair of rolls ties and has to be re-rolled
+    tie_probability: float
+    expected_rolls: float
+    # Damage dealt by whoever wins: {damage: probability}
+    damage_distribution: dict[int, float]
+    expected_damage: float
+
+
+# Every equally likely total of one TTRPG roll after sanity effects, ascending
+def ttrpg_totals(base_power: int, dice_power: int, sanity: int) -> np.ndarray:
+    mod_base, mod_dice = apply_sanity_mod(sanity, base_power, dice_power)
+    dice_sign = 1 if dice_power >= 0 else -1
+    return np.sort(mod_base + dice_sign * np.arange(1, mod_dice + 1, dtype=np.int64))
+
+
+# Exact /clash_ttrpg odds. Both rolls are uniform, so sorting one side and
+# binary-searching it counts the winning, losing and tied pairs in
+# O(n log n); each total that wins is dealt as damage once per roll it beats.
+@lru_cache(maxsize=4096)
+def exact_ttrpg_odds(base1: int, dice1: int, sanity1: int,
+                     base2: int, dice2: int, sanity2: int) -> TtrpgOdds:
+    totals1 = ttrpg_totals(base1, dice1, sanity1)
+    totals2 = ttrpg_totals(base2, dice2, sanity2)
+    pairs = totals1.size * totals2.size
+
+    # For each total, how many of the other side's totals it beats
+    beats2 = np.searchsorted(totals2, totals1, side="left")
+    beats1 = np.searchsorted(totals1, totals2, side="left")
+    win = beats2.sum() / pairs
+    lose = beats1.sum() / pairs
+    tie = 1.0 - win - lose
+
+    decisive = win + lose
+    if decisive <= 1e-15:
+        # Can only ever tie; the engine stops at its re-roll cap with no winner
+        return TtrpgOdds(0.0, 0.0, 1.0, float(MAX_CLASH_STEPS + 1), {}, 0.0)
+
+    values, index = np.unique(np.concatenate([totals1, totals2]), return_inverse=True)
+    weights = np.bincount(index.reshape(-1), weights=np.concatenate([beats2, beats1])) / (pairs * decisive)
+    damage = {int(d): float(q) for d, q in zip(values, weights) if q > 0}
+    return TtrpgOdds(
+        win_probability=win / decisive,
+        opponent_win_probability=lose / decisive,
+        tie_probability=tie,
+        expected_rolls=1 / decisive,
+        damage_distribution=damage,
+        expected_damage=float(values @ weights),
+    )
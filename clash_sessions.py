@@ -0,0 +1,178 @@
+import secrets
+import time
+from dataclasses import dataclass, field
+
+from config import env_int
+
+LIMBUS = "limbus"
+TTRPG = "ttrpg"
+
+# How long a challenge stays open for someone to join
+CLASH_TIMEOUT = 30
+MAX_CLASHES_PER_USER = env_int("MAX_CLASHES_PER_USER", 2, minimum=1)
+MAX_CLASHES_PER_CHANNEL = env_int("MAX_CLASHES_PER_CHANNEL", 5, minimum=1)
+MAX_CLASHES = env_int("MAX_CLASHES", 500, minimum=1)
+
+
+# Raised when opening a challenge would go over a limit; the message is user-facing
+class SessionLimitError(Exception):
+    pass
+
+
+# An open challenge waiting for an opponent
+@dataclass
+class ClashSession:
+    session_id: str
+    # LIMBUS or TTRPG
+    kind: str
+    user_id: int
+    user_name: str
+    channel_id: int
+    # The challenger's skill as loaded when the challenge opened
+    skill: tuple
+    sanity: int
+    live: bool
+    expires_at: float
+    # None for DMs
+    guild_id: int | None = None
+    message_id: int | None = None
+    # The Discord view showing this challenge, if any
+    view: object = field(default=None, compare=False, repr=False)
+    # Pending write of this session to storage, if any
+    saved: object = field(default=None, compare=False, repr=False)
+
+    @property
+    def skill_name(self) -> str:
+        return self.skill[0] if self.kind == LIMBUS else self.skill[1]
+
+    # Compact row for the clash_sessions table
+    def to_row(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "kind": self.kind,
+            "user_id": self.user_id,
+            "user_name": self.user_name,
+            "channel_id": self.channel_id,
+            "guild_id": self.guild_id,
+            "message_id": self.message_id,
+            "skill": list(self.skill),
+            "sanity": self.sanity,
+            "live": self.live,
+            "expires_at": self.expires_at,
+        }
+
+    @classmethod
+    def from_row(cls, row: dict) -> "ClashSession":
+        return cls(**{**row, "skill": tuple(row["skill"])})
+
+
+# Bounded registry of open challenges, indexed by user and channel
+class SessionRegistry:
+    def __init__(self, per_user: int = MAX_CLASHES_PER_USER,
+                 per_channel: int = MAX_CLASHES_PER_CHANNEL,
+                 total: int = MAX_CLASHES):
+        self.per_user = per_user
+        self.per_channel = per_channel
+        self.total = total
+        self.opened = 0
+        self.expired = 0
+        self._sessions: dict[str, ClashSession] = {}
+        self._by_user: dict[int, set[str]] = {}
+        self._by_channel: dict[int, set[str]] = {}
+        self._by_message: dict[int, str] = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def open(self, kind: str, user_id: int, user_name: str, channel_id: int,
+             skill: tuple, sanity: int, live: bool = False, timeout: float = CLASH_TIMEOUT,
+             guild_id: int | None = None) -> ClashSession:
+        # Reclaim anything already past its deadline before checking limits
+        self.expire()
+
+        if len(self._by_user.get(user_id, ())) >= self.per_user:
+            raise SessionLimitError(
+                f"You already have {self.per_user} open clash(es). Wait for them to finish or cancel one."
+            )
+        if len(self._by_channel.get(channel_id, ())) >= self.per_channel:
+            raise SessionLimitError("This channel has too many open clashes. Try again shortly.")
+        if len(self._sessions) >= self.total:
+            raise SessionLimitError("Too many clashes are open right now. Try again shortly.")
+
+        session = ClashSession(
+            session_id=secrets.token_urlsafe(9),
+            kind=kind,
+            user_id=user_id,
+            user_name=user_name,
+            channel_id=channel_id,
+            skill=tuple(skill),
+            sanity=sanity,
+            live=live,
+            expires_at=time.time() + timeout,
+            guild_id=guild_id,
+        )
+        self._add(session)
+        self.opened += 1
+        return session
+
+    # Link a session to the message showing it, so buttons can find it
+    def attach_message(self, session: ClashSession, message_id: int):
+        session.message_id = message_id
+        if session.session_id in self._sessions:
+            self._by_message[message_id] = session.session_id
+
+    # Re-add a session loaded from storage; limits don't apply to these
+    def restore(self, session: ClashSession) -> bool:
+        if session.session_id in self._sessions or session.expires_at <= time.time():
+            return False
+        self._add(session)
+        return True
+
+    def get_by_message(self, message_id: int) -> ClashSession | None:
+        session_id = self._by_message.get(message_id)
+        return self.get(session_id) if session_id else None
+
+    def get(self, session_id: str) -> ClashSession | None:
+        session = self._sessions.get(session_id)
+        if session is None or session.expires_at <= time.time():
+            return None
+        return session
+
+    # Take a session out of the registry; only the first caller gets it
+    def claim(self, session_id: str) -> ClashSession | None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._unindex(session)
+        return session
+
+    # Remove and return every session past its deadline
+    def expire(self, now: float | None = None) -> list[ClashSession]:
+        now = time.time() if now is None else now
+        expired = [s for s in self._sessions.values() if s.expires_at <= now]
+        for session in expired:
+            self.claim(session.session_id)
+        self.expired += len(expired)
+        return expired
+
+    def for_user(self, user_id: int) -> list[ClashSession]:
+        return [self._sessions[sid] for sid in self._by_user.get(user_id, ())]
+
+    def count_channel(self, channel_id: int) -> int:
+        return len(self._by_channel.get(channel_id, ()))
+
+    def _add(self, session: ClashSession):
+        self._sessions[session.session_id] = session
+        self._by_user.setdefault(session.user_id, set()).add(session.session_id)
+        self._by_channel.setdefault(session.channel_id, set()).add(session.session_id)
+        if session.message_id is not None:
+            self._by_message[session.message_id] = session.session_id
+
+    def _unindex(self, session: ClashSession):
+        if session.message_id is not None:
+            self._by_message.pop(session.message_id, None)
+        for index, key in ((self._by_user, session.user_id), (self._by_channel, session.channel_id)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(session.session_id)
+                if not ids:
+                    del index[key]
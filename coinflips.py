@@ -1,285 +1,828 @@
 from dotenv import load_dotenv
-import os
-import random
+import asyncio
+import hashlib
+import importlib
+import io
+import json
+import sys
+import time
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from discord.ui import View, Button, Modal, TextInput
 from discord import Interaction
 
 load_dotenv()
 
-TOKEN = os.getenv("DISCORD_TOKEN")
+import config
+from config import ConfigError, env_flag, env_float, env_int, env_str, worker_index
+
+TOKEN = env_str("DISCORD_TOKEN")
 # default to test if not set
-MODE = os.getenv("BOT_MODE", "test")  
+MODE = env_str("BOT_MODE", "test")
 # needed only for testing
-GUILD_ID_ENV = os.getenv("GUILD_ID")
-GUILD_ID = int(GUILD_ID_ENV) if GUILD_ID_ENV else None 
+GUILD_ID = env_int("GUILD_ID", None)
+
+
+# Parse "0-3" or "0,2,5" into shard IDs
+def parse_shard_ids(text: str):
+    ids = []
+    try:
+        for part in text.split(","):
+            part = part.strip()
+            if "-" in part:
+                low, high = part.split("-", 1)
+                ids.extend(range(int(low), int(high) + 1))
+            elif part:
+                ids.append(int(part))
+    except ValueError:
+        config.problems.append(f'SHARD_IDS must look like "0-3" or "0,2,5" (got {text!r})')
+        return None
+    return ids or None
+
+# Sharding: SHARD_COUNT shards in total across every worker. A worker runs
+# SHARD_IDS if set, otherwise every WORKER_COUNT-th shard starting at its index.
+# SHARDED=1 alone lets Discord pick the shard count for a single process.
+SHARD_COUNT = env_int("SHARD_COUNT", None, minimum=1)
+WORKER_COUNT = env_int("WORKER_COUNT", 1, minimum=1)
+WORKER_INDEX = worker_index()
+SHARD_IDS = parse_shard_ids(env_str("SHARD_IDS", ""))
+if SHARD_IDS is None and SHARD_COUNT and WORKER_COUNT > 1:
+    SHARD_IDS = list(range(WORKER_INDEX, SHARD_COUNT, WORKER_COUNT))
+if SHARD_IDS is not None and SHARD_COUNT is None:
+    config.problems.append("SHARD_IDS needs SHARD_COUNT (the total across every worker)")
+    SHARD_IDS = None
+elif SHARD_IDS is not None and max(SHARD_IDS) >= SHARD_COUNT:
+    config.problems.append(f"SHARD_IDS {SHARD_IDS} go past SHARD_COUNT={SHARD_COUNT}")
+if WORKER_COUNT > 1 and SHARD_COUNT is None:
+    config.problems.append("WORKER_COUNT > 1 needs SHARD_COUNT, or every worker gets every interaction")
+SHARDED = env_flag("SHARDED") or SHARD_COUNT is not None
+# Only one worker syncs the command tree
+PRIMARY_WORKER = SHARD_IDS is None or 0 in SHARD_IDS
+MULTI_WORKER = WORKER_COUNT > 1 or SHARD_IDS is not None
+
+# Everything arrives as interactions; only the guilds intent is needed for
+# channel and guild lookups, so message and member traffic is never sent
+intents = discord.Intents.none()
+intents.guilds = True
+
+# Async Supabase storage
+from storage import (
+    save_skill, load_skill, load_skills, delete_skill,
+    save_skill_ttrpg, load_skill_ttrpg, delete_skill_ttrpg,
+    list_skills_page, suggest_skill_names, skill_cache, insert_skills, load_user_skills,
+    SKILLS_TABLE, TTRPG_SKILLS_TABLE, SkillRejected, verify_schema,
+    save_clash_session, delete_clash_session, load_clash_sessions,
+    load_command_fingerprint, save_command_fingerprint, warm_skill_cache,
+    SupabaseUnavailable, breaker, replica, replay_pending_writes, REPLICA_MAX_USERS
+)
+from clash_sessions import LIMBUS, TTRPG, ClashSession, SessionLimitError, SessionRegistry
+from skill_sheets import SheetError, check_sheet_size, read_sheet, validate_sheet, write_sheet
+import metrics
+from metrics import Gauge, command_errors, command_seconds, current_command, phase
+from deadlines import deadline_aware, edit_response, message_id, observe_latency, reply, run_with_deadline
+
+
+# Pure clash rules; clash_odds (NumPy) is loaded by load_clash_odds()
+from clash_engine import (
+    DEFAULT_TRIALS, MAX_COINS, MAX_DICE, MAX_TRIALS, SkillSpec, clamp_sanity, flip_coins,
+    run_clash, roll_ttrpg, run_clash_ttrpg
+)
+
+# Discord caps messages at 2000 characters; leave room for the page footer
+CLASH_PAGE_LIMIT = 1900
+# Live clashes reveal this many log blocks per edit, at most once per interval
+CLASH_LIVE_STEPS = 3
+CLASH_LIVE_INTERVAL = 1.5
+# Leave headroom under Discord's 3 second autocomplete deadline
+AUTOCOMPLETE_TIMEOUT = 2.0
+# How long a button click waits for challenges to be restored after a restart
+RESTORE_WAIT = 2.0
+# Serve Prometheus metrics on this local port, and/or print them every N seconds
+METRICS_PORT = env_int("METRICS_PORT", 0, minimum=0)
+METRICS_LOG_INTERVAL = env_float("METRICS_LOG_INTERVAL", 0.0, minimum=0)
+# How many recently active users per table get their skills cached after startup
+WARM_USERS = env_int("WARM_USERS", 50, minimum=0)
+# Workers cache skills separately and never hear about each other's saves and
+# deletes (a user's guilds and DMs can land on different workers), so with
+# several workers cached skills go stale quickly unless SKILL_CACHE_TTL is set
+MULTI_WORKER_CACHE_TTL = 15.0
+if MULTI_WORKER and env_str("SKILL_CACHE_TTL") is None:
+    skill_cache.ttl = MULTI_WORKER_CACHE_TTL
+
+# ----------------------
+# Message Helpers
+# ----------------------
+
+# Break a block longer than `limit` into pieces at line ends (or mid-line
+# for a line that is too long by itself)
+def split_block(block: str, limit: int) -> list[str]:
+    pieces = []
+    current = ""
+    for line in block.split("\n"):
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + len(line) + 1 > limit:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+# Group log blocks into pages that each fit in one message
+def paginate(blocks, limit=CLASH_PAGE_LIMIT):
+    pages = []
+    current = ""
+    for block in (piece for block in blocks for piece in split_block(block, limit)):
+        if current and len(current) + len(block) + 2 > limit:
+            pages.append(current)
+            current = block
+        else:
+            current = f"{current}\n\n{block}" if current else block
+    if current:
+        pages.append(current)
+    return pages
+
+# Prev/Next buttons over pre-rendered pages
+class PageView(View):
+    def __init__(self, pages, index=0, timeout=600):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.index = index
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.prev_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.pages) - 1
+
+    def content(self):
+        return f"{self.pages[self.index]}\n\n*Page {self.index + 1}/{len(self.pages)}*"
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(0, self.index - 1)
+        self.update_buttons()
+        await interaction.response.edit_message(content=self.content(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = min(len(self.pages) - 1, self.index + 1)
+        self.update_buttons()
+        await interaction.response.edit_message(content=self.content(), view=self)
+
+# Render one skill list line per table
+def format_skill_line(table: str, s) -> str:
+    if table == TTRPG_SKILLS_TABLE:
+        dice = f"+ 1d{s['dice_power']}" if s["dice_power"] >= 0 else f"- 1d{abs(s['dice_power'])}"
+        return (
+            f"**Slot {s['skill_slot']}** | ID `{s['user_skill_id']}`\n"
+            f"{s['skill_name']} → {s['base_power']} {dice}"
+        )
+    return (
+        f"ID `{s['user_skill_id']}` | **{s['skill_name']}**\n"
+        f"{s['base_power']} + {s['coin_power']} × {s['coins']} coins"
+        + (f" ({s['unbreakable']} unbreakable)" if s["unbreakable"] else "")
+    )
 
+SKILL_LIST_TITLES = {
+    SKILLS_TABLE: "**__Skill List__**",
+    TTRPG_SKILLS_TABLE: "**__TTRPG Skill List__**",
+}
+
+# Prev/Next over a skill list, fetching one keyset page per click
+class SkillListView(View):
+    def __init__(self, table: str, user_id: str, rows, has_prev: bool, has_next: bool, timeout=300):
+        super().__init__(timeout=timeout)
+        self.table = table
+        self.user_id = user_id
+        self.show(rows, has_prev, has_next)
+
+    def show(self, rows, has_prev: bool, has_next: bool):
+        self.rows = rows
+        self.prev_page.disabled = not has_prev
+        self.next_page.disabled = not has_next
+
+    def content(self):
+        lines = [format_skill_line(self.table, s) for s in self.rows]
+        return SKILL_LIST_TITLES[self.table] + "\n\n" + "\n\n".join(lines)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        current_command.set("skill_list_page")
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception, item):
+        if isinstance(error, SupabaseUnavailable):
+            await reply(interaction, str(error), ephemeral=True)
+            return
+        await super().on_error(interaction, error, item)
+
+    # Fetch the neighbouring keyset page against the click's deadline, then show it
+    async def turn_page(self, interaction: discord.Interaction, backward: bool):
+        if backward:
+            page = list_skills_page(self.table, self.user_id, before_id=self.rows[0]["user_skill_id"])
+        else:
+            page = list_skills_page(self.table, self.user_id, after_id=self.rows[-1]["user_skill_id"])
+        result = await run_with_deadline(interaction, page, update=True)
+        if result is None:
+            return
+
+        rows, has_more = result
+        if rows and backward:
+            self.show(rows, has_more, True)
+        elif rows:
+            self.show(rows, True, has_more)
+        await edit_response(interaction, content=self.content(), view=self)
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn_page(interaction, backward=True)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn_page(interaction, backward=False)
+
+# Send the first page of a user's skill list
+async def send_skill_list(interaction: discord.Interaction, table: str):
+    user_id = str(interaction.user.id)
+    rows, has_next = await list_skills_page(table, user_id)
 
-intents = discord.Intents.default()
-intents.message_content = True
+    if not rows:
+        await reply(interaction,
+            "You have no saved TTRPG skills." if table == TTRPG_SKILLS_TABLE else "You have no saved skills.",
+            ephemeral=True
+        )
+        return
 
-# Supabase table
-from supabase import create_client, Client
+    view = SkillListView(table, user_id, rows, has_prev=False, has_next=has_next)
+    await reply(interaction, view.content(), view=view, ephemeral=True)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Skill name autocomplete; must answer inside Discord's 3 second window
+async def suggest_skills(interaction: discord.Interaction, current: str, table: str):
+    try:
+        names = await asyncio.wait_for(
+            suggest_skill_names(str(interaction.user.id), table, current),
+            AUTOCOMPLETE_TIMEOUT
+        )
+    except Exception:
+        return []
+    return [app_commands.Choice(name=name[:100], value=name[:100]) for name in names]
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+async def skill_autocomplete(interaction: discord.Interaction, current: str):
+    return await suggest_skills(interaction, current, SKILLS_TABLE)
 
+async def ttrpg_skill_autocomplete(interaction: discord.Interaction, current: str):
+    return await suggest_skills(interaction, current, TTRPG_SKILLS_TABLE)
 
-HEAD = "<:limbus_heads:1463921098394439774>"
-TAIL = "<:limbus_tails:1463921048704647188>"
-UNBREAKABLE_HEAD = "<:limbus_unbreakable_heads:1463921190228721684>"
-UNBREAKABLE_TAIL = "<:limbus_unbreakable_tails:1463921283946512566>"
-MAX_SANITY = 45
-MIN_SANITY = -45
+# Show a finished clash log on the challenge message, paginated or revealed live.
+# `interaction` is the one that completed the challenge (the join modal).
+async def send_clash_log(interaction: discord.Interaction, blocks, live=False):
+    pages = paginate(blocks)
+
+    if not live:
+        if len(pages) == 1:
+            await edit_response(interaction, content=pages[0], view=None)
+        else:
+            view = PageView(pages)
+            await edit_response(interaction, content=view.content(), view=view)
+        return
+
+    # Live mode: edit one message at a throttled cadence
+    shown = min(len(blocks), CLASH_LIVE_STEPS)
+    await edit_response(interaction, content=paginate(blocks[:shown])[-1], view=None)
+    while shown < len(blocks):
+        await asyncio.sleep(CLASH_LIVE_INTERVAL)
+        shown = min(len(blocks), shown + CLASH_LIVE_STEPS)
+        await interaction.edit_original_response(content=paginate(blocks[:shown])[-1])
+
+    if len(pages) > 1:
+        view = PageView(pages, index=len(pages) - 1)
+        await interaction.edit_original_response(content=view.content(), view=view)
 
 # ----------------------
-# Limbus Skill Functions
+# Clash Challenges
 # ----------------------
 
-# Save Skill Function
-def save_skill(user_id, skill_name, base_power, coin_power, coins, unbreakable):
-    # Get max skill id for user
-    res = (
-        supabase
-        .table("skills")
-        .select("user_skill_id")
-        .eq("user_id", user_id)
-        .order("user_skill_id", desc=True)
-        .limit(1)
-        .execute()
+clash_sessions = SessionRegistry()
+# Set once challenges from before a restart are back in the registry
+sessions_restored = asyncio.Event()
+# Storage writes that shouldn't hold up a reply; referenced until they finish
+background_tasks = set()
+
+CHALLENGE_TEXT = {
+    LIMBUS: "⚔️ COMBAT START - CLASH\n<@{user_id}> uses **{skill_name}**!\n",
+    TTRPG: "⚔️ CLASH START - <@{user_id}> uses **{skill_name}**!\n",
+}
+WAITING_TEXT = {
+    LIMBUS: "Waiting for an opponent...",
+    TTRPG: "Waiting for a challenger...",
+}
+
+def challenge_text(session: ClashSession, status: str = None) -> str:
+    return (
+        CHALLENGE_TEXT[session.kind].format(user_id=session.user_id, skill_name=session.skill_name)
+        + (status or WAITING_TEXT[session.kind])
     )
 
-    user_skill_id = (res.data[0]["user_skill_id"] if res.data else 0) + 1
-
-    supabase.table("skills").upsert({
-        "user_id": user_id,
-        "user_skill_id": user_skill_id,
-        "skill_name": skill_name,
-        "base_power": base_power,
-        "coin_power": coin_power,
-        "coins": coins,
-        "unbreakable": unbreakable
-    }).execute()
-
-    return user_skill_id
-
-# Load skill function (for /flip)
-def load_skill(user_id, skill_name=None, skill_id=None):
-    query = supabase.table("skills").select(
-        "skill_name, base_power, coin_power, coins, unbreakable"
-    ).eq("user_id", user_id)
-
-    if skill_id is not None:
-        query = query.eq("user_skill_id", skill_id)
-    elif skill_name is not None:
-        query = query.eq("skill_name", skill_name)
-    else:
-        return None
+# Render a Limbus clash between the challenger and whoever joined
+def render_clash(session: ClashSession, user2: discord.abc.User, skill2, sanity2: int):
+    skill1_name, base_power1, coin_power1, coins1, unbreakable1 = session.skill
+    skill2_name, base_power2, coin_power2, coins2, unbreakable2 = skill2
 
-    res = query.limit(1).execute()
+    result = run_clash(
+        SkillSpec(base_power1, coin_power1, coins1, unbreakable1), session.sanity,
+        SkillSpec(base_power2, coin_power2, coins2, unbreakable2), sanity2
+    )
+    names = (session.user_name, user2.display_name)
+
+    clash_log = [challenge_text(session, f"{user2.mention} joins with **{skill2_name}**!")]
+    for step in result.steps:
+        loser_name = names[step.loser - 1] if step.loser else None
+        clash_log.append(
+            f"**Clash Step {step.number}:**\n"
+            f"{names[0]}: {step.flip1.trail} ({step.flip1.total})\n"
+            f"{names[1]}: {step.flip2.trail} ({step.flip2.total})\n"
+            + (f"Loser of this step: {loser_name}" if loser_name else "It's a tie!")
+        )
 
-    if not res.data:
-        return None
+    if result.winner is None:
+        clash_log.append(f"🤝 **Stalemate!** Neither side can win this clash after {len(result.steps)} steps.")
+        return clash_log
 
-    row = res.data[0]
-    return (
-        row["skill_name"],
-        row["base_power"],
-        row["coin_power"],
-        row["coins"],
-        row["unbreakable"]
+    # --- Post-clash flips ---
+    winner = names[result.winner - 1]
+    loser = names[2 - result.winner]
+    clash_log.append(
+        f"🏆 **{winner}** flips all remaining coins:\n{result.winner_flip.trail}\nTotal Power: {result.winner_flip.total}"
     )
+    if result.loser_flip:
+        clash_log.append(
+            f"💀 **{loser}** flips their unbreakable coins:\n{result.loser_flip.trail}\nTotal Power: {result.loser_flip.total}"
+        )
+    return clash_log
 
-# Delete skill function
-def delete_skill(user_id, skill_name=None, skill_id=None):
-    query = supabase.table("skills").select("skill_name").eq("user_id", user_id)
+# Render a TTRPG clash between the challenger and whoever joined
+def render_clash_ttrpg(session: ClashSession, user2: discord.abc.User, skill2, sanity2: int):
+    _, _, base1, dice_power1 = session.skill
+    _, skill2_name, base2, dice_power2 = skill2
 
-    if skill_id is not None:
-        query = query.eq("user_skill_id", skill_id)
-    elif skill_name is not None:
-        query = query.eq("skill_name", skill_name)
+    result = run_clash_ttrpg(base1, dice_power1, session.sanity, base2, dice_power2, sanity2)
+    roll1, roll2 = result.roll1, result.roll2
+    if result.winner is None:
+        outcome = f"🤝 **Stalemate!** Still tied after {result.rerolls} re-rolls; no damage dealt."
     else:
-        return None
+        winner = session.user_name if result.winner == 1 else user2.display_name
+        outcome = f"**{winner}**'s Damage Dealt: {result.damage}"
 
-    res = query.limit(1).execute()
-    if not res.data:
-        return None
+    return [
+        challenge_text(session, f"{user2.mention} joins with **{skill2_name}**!"),
+        f"{session.user_name}\n"
+        f"{roll1.mod_base} + 1d{roll1.mod_dice} ({roll1.roll}) → **Total: {roll1.total}**\n"
+        f"{user2.display_name}\n"
+        f"{roll2.mod_base} + 1d{roll2.mod_dice} ({roll2.roll}) → **Total: {roll2.total}**\n\n"
+        + outcome
+    ]
+
+CLASH_LOADERS = {LIMBUS: load_skill, TTRPG: load_skill_ttrpg}
+CLASH_RENDERERS = {LIMBUS: render_clash, TTRPG: render_clash_ttrpg}
+
+def run_in_background(coro, what: str):
+    def done(task):
+        background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"WARNING: {what} failed ({task.exception()})")
+
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(done)
+    return task
+
+# Delete a stored session, after its own save if that is still in flight
+async def forget_session(session: ClashSession):
+    if session.saved is not None:
+        await asyncio.wait([session.saved])
+    await delete_clash_session(session.session_id)
+
+# Close a session for good: drop it from the registry, stop its view and delete its row
+def close_session(session_id: str) -> ClashSession | None:
+    session = clash_sessions.claim(session_id)
+    if session is not None:
+        if session.view is not None:
+            session.view.stop()
+        run_in_background(forget_session(session), "deleting a clash challenge")
+    return session
+
+# Find the open session behind a challenge message's buttons
+async def find_session(interaction: discord.Interaction) -> ClashSession | None:
+    session = clash_sessions.get_by_message(interaction.message.id)
+    if session is None and not sessions_restored.is_set():
+        try:
+            await asyncio.wait_for(sessions_restored.wait(), RESTORE_WAIT)
+        except asyncio.TimeoutError:
+            pass
+        session = clash_sessions.get_by_message(interaction.message.id)
+    return session
+
+# Challenger inputs sanity first, then skill
+class ChallengeModal(Modal):
+    sanity_input = TextInput(
+        label="Sanity (-45 to 45)",
+        placeholder="Enter your sanity first",
+        required=True,
+        max_length=5
+    )
+    skill_input = TextInput(
+        label="Skill name or ID",
+        placeholder="Enter your skill name or ID",
+        required=True,
+        max_length=50
+    )
+
+    def __init__(self, session: ClashSession):
+        super().__init__(title="Join Clash" if session.kind == LIMBUS else "Join TTRPG Clash")
+        self.session_id = session.session_id
+        self.kind = session.kind
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception):
+        if isinstance(error, SupabaseUnavailable):
+            await reply(interaction, str(error), ephemeral=True)
+            return
+        await super().on_error(interaction, error)
+
+    async def on_submit(self, modal_interaction: discord.Interaction):
+        current_command.set(f"{self.kind}_clash_join")
+        # The live reveal paces itself, so only loading and rolling run against the deadline
+        result = await run_with_deadline(modal_interaction, self.submit(modal_interaction), update=True)
+        if result is not None:
+            session, blocks = result
+            await send_clash_log(modal_interaction, blocks, live=session.live)
+
+    # Load the joiner's skill and roll the clash; returns (session, log blocks) or None
+    async def submit(self, modal_interaction: discord.Interaction):
+        if clash_sessions.get(self.session_id) is None:
+            await reply(modal_interaction, "This clash is no longer open.", ephemeral=True)
+            return
+
+        try:
+            sanity_val = clamp_sanity(int(self.sanity_input.value))
+        except ValueError:
+            session = close_session(self.session_id)
+            if session is not None:
+                await edit_response(modal_interaction, 
+                    content=challenge_text(session, "Invalid input! Challenge cancelled."), view=None
+                )
+            return
 
-    skill_name = res.data[0]["skill_name"]
+        skill_val = self.skill_input.value.strip()
+        challenger_id = str(modal_interaction.user.id)
 
-    delete_query = supabase.table("skills").delete().eq("user_id", user_id)
-    if skill_id is not None:
-        delete_query = delete_query.eq("user_skill_id", skill_id)
-    else:
-        delete_query = delete_query.eq("skill_name", skill_name)
-
-    delete_query.execute()
-    return skill_name
-
-# Helper function to flip coins (for /clash)
-def flip_skill(user_id, skill_name,  skill_id, sanity, skill_data):
-    base_power, coin_power, coins, unbreakable = skill_data
-    total_power = base_power
-    normal_coins = coins - unbreakable
-    head_chance = 50 + sanity
-    trail = ""
-
-    # Normal coins
-    for _ in range(normal_coins):
-        roll = random.randint(1, 100)
-        if roll <= head_chance:
-            total_power += coin_power
-            trail += f"{HEAD} "
-        else:
-            trail += f"{TAIL} "
-
-    # Unbreakable coins
-    for _ in range(unbreakable):
-        roll = random.randint(1, 100)
-        if roll <= head_chance:
-            total_power += coin_power
-            trail += f"{UNBREAKABLE_HEAD} "
+        # Determine if input is ID or name
+        load = CLASH_LOADERS[self.kind]
+        if skill_val.isdigit():
+            challenger_skill = await load(challenger_id, skill_id=int(skill_val))
         else:
-            trail += f"{UNBREAKABLE_TAIL} "
+            challenger_skill = await load(challenger_id, skill_name=skill_val)
+
+        # First valid submission takes the clash
+        session = close_session(self.session_id)
+        if session is None:
+            await reply(modal_interaction, "Someone else already joined this clash.", ephemeral=True)
+            return
+
+        if not challenger_skill:
+            await edit_response(modal_interaction, 
+                content=challenge_text(session, f"Skill **{skill_val}** not found. Challenge cancelled."),
+                view=None
+            )
+            return
+
+        with phase("engine"):
+            blocks = CLASH_RENDERERS[self.kind](session, modal_interaction.user, challenger_skill, sanity_val)
+        return session, blocks
+
+# --- Challenge Button + Modal ---
+# Buttons have fixed custom_ids and find their session by message, so one
+# instance registered at startup answers challenges posted before a restart
+class ChallengeView(View):
+    def __init__(self, session: ClashSession = None):
+        super().__init__(timeout=None)
+        if session is not None:
+            session.view = self
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        current_command.set(f"clash_{interaction.data.get('custom_id', 'button').split(':')[-1]}")
+        return True
+
+    @discord.ui.button(label="Join Clash", style=discord.ButtonStyle.primary, custom_id="clash:join")
+    async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
+        session = await find_session(interaction)
+        if session is None:
+            await interaction.response.send_message("This clash is no longer open.", ephemeral=True)
+            return
+        if interaction.user.id == session.user_id:
+            await interaction.response.send_message("You can't challenge yourself!", ephemeral=True)
+            return
+
+        await interaction.response.send_modal(ChallengeModal(session))
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.secondary, custom_id="clash:cancel")
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        session = await find_session(interaction)
+        if session is None:
+            await interaction.response.send_message("This clash is no longer open.", ephemeral=True)
+            return
+        if interaction.user.id != session.user_id:
+            await interaction.response.send_message("Only the challenger can cancel this clash.", ephemeral=True)
+            return
+
+        close_session(session.session_id)
+        await interaction.response.edit_message(content=challenge_text(session, "Clash cancelled."), view=None)
+
+# Open a challenge for a loaded skill and post it with a Join button
+async def open_challenge(interaction: discord.Interaction, kind: str, skill, sanity: int, live: bool = False):
+    try:
+        session = clash_sessions.open(
+            kind, interaction.user.id, interaction.user.display_name,
+            interaction.channel_id, skill, sanity, live, guild_id=interaction.guild_id
+        )
+    except SessionLimitError as e:
+        await reply(interaction, str(e), ephemeral=True)
+        return
 
-    return total_power, normal_coins, unbreakable, trail
+    view = ChallengeView(session)
+    response = await reply(interaction, challenge_text(session), view=view)
+    clash_sessions.attach_message(session, message_id(response))
+    # Store it so the challenge survives a restart; the reply is already out
+    session.saved = run_in_background(save_clash_session(session.to_row()), "saving a clash challenge")
+
+# Mark an expired challenge's message as cancelled and delete its row
+async def retire_session(session: ClashSession):
+    if session.view is not None:
+        session.view.stop()
+    await forget_session(session)
+    if session.message_id is None:
+        return
+    message = bot.get_partial_messageable(session.channel_id).get_partial_message(session.message_id)
+    try:
+        await message.edit(content=challenge_text(session, "No one challenged in time. Clash cancelled."), view=None)
+    except discord.HTTPException:
+        pass
+
+# Expire abandoned challenges and retire their messages
+@tasks.loop(seconds=5)
+async def reap_clash_sessions():
+    for session in clash_sessions.expire():
+        await retire_session(session)
+
+# Replay skill writes queued during a Supabase outage, and keep the replica bounded
+@tasks.loop(seconds=15)
+async def replay_writes():
+    try:
+        replayed = await replay_pending_writes()
+        if replayed:
+            print(f"Replayed {replayed} queued skill write(s)")
+        replica.prune(REPLICA_MAX_USERS)
+    except Exception as e:
+        print(f"WARNING: replaying queued skill writes failed ({e})")
+
+# Reload challenges that were open before a restart. Their skills were stored
+# with them, so nothing is looked up again; ones that ran out while the bot
+# was down are retired right away.
+async def restore_clash_sessions():
+    try:
+        rows = await load_clash_sessions()
+    except Exception as e:
+        sessions_restored.set()
+        print(f"WARNING: could not restore clash challenges ({e})")
+        return
+
+    expired = []
+    rows = [row for row in rows if owns_guild(row.get("guild_id"))]
+    for row in rows:
+        session = ClashSession.from_row(row)
+        if not clash_sessions.restore(session) and clash_sessions.get(session.session_id) is None:
+            expired.append(session)
+    sessions_restored.set()
+    print(f"Restored {len(rows) - len(expired)} open clash challenge(s)")
+
+    for session in expired:
+        await retire_session(session)
 
 # ----------------------
 # TTRPG Skill Functions
 # ----------------------
 
-# Save Skill TTRPG Function
-async def save_skill_ttrpg(user_id: str, skill_slot: int, skill_name: str, base_power: int, dice_power: int):
-    result = supabase.table("ttrpg_skills").select("user_skill_id").eq("user_id", user_id).order("user_skill_id", desc=True).limit(1).execute()
-    row = result.data[0] if result.data else None
-    user_skill_id = (row["user_skill_id"] if row else 0) + 1
-
-    # Insert the skill
-    supabase.table("ttrpg_skills").insert({
-        "user_id": user_id,
-        "user_skill_id": user_skill_id,
-        "skill_slot": skill_slot,
-        "skill_name": skill_name,
-        "base_power": base_power,
-        "dice_power": dice_power
-    }).execute()
-
-    return user_skill_id
-
-# Load Skill TTRPG Function (for /flip_ttrpg)
-async def load_skill_ttrpg(user_id: str, skill_name: str = None, skill_id: int = None):
-    query = supabase.table("ttrpg_skills").select("*").eq("user_id", user_id)
-
-    if skill_id is not None:
-        query = query.eq("user_skill_id", skill_id)
-    elif skill_name is not None:
-        query = query.eq("skill_name", skill_name)
-    else:
-        return None
-
-    result = query.execute()
-    if result.data:
-        row = result.data[0]
-        return row["skill_slot"], row["skill_name"], row["base_power"], row["dice_power"]
-    return None
-
-# Delete Skill TTRPG Function
-async def delete_skill_ttrpg(user_id: str, skill_name: str = None, skill_id: int = None):
-    skill = await load_skill_ttrpg(user_id, skill_name, skill_id)
-    if not skill:
-        return None
-
-    skill_slot, skill_name, _, _ = skill
-
-    if skill_id is not None:
-        supabase.table("ttrpg_skills").delete().eq("user_id", user_id).eq("user_skill_id", skill_id).execute()
-    else:
-        supabase.table("ttrpg_skills").delete().eq("user_id", user_id).eq("skill_name", skill_name).execute()
-
-    return skill_name
-
-# Helper function to apply sanity effects
-def apply_sanity_mod(sanity: int, base_power: int, dice_power: int) -> tuple[int, int]:
-    positive_coin = dice_power >= 0
-    mod_base = base_power
-    mod_dice = abs(dice_power)
-    
-    if positive_coin:
-        if -45 <= sanity <= -41:
-            mod_base -= 3
-            mod_dice += 2
-        elif -40 <= sanity <= -21:
-            mod_base -= 2
-            mod_dice += 2
-        elif -20 <= sanity <= -1:
-            mod_base -= 1
-            mod_dice += 1
-        elif 1 <= sanity <= 20:
-            mod_base += 1
-            mod_dice -= 1
-        elif 21 <= sanity <= 40:
-            mod_base += 2
-            mod_dice -= 2
-        elif 41 <= sanity <= 45:
-            mod_base += 3
-            mod_dice -= 2
-    else:  # negative coins, reverse effects
-        if -45 <= sanity <= -41:
-            mod_base += 3
-            mod_dice -= 2
-        elif -40 <= sanity <= -21:
-            mod_base += 2
-            mod_dice -= 2
-        elif -20 <= sanity <= -1:
-            mod_base += 1
-            mod_dice -= 1
-        elif 1 <= sanity <= 20:
-            mod_base -= 1
-            mod_dice += 1
-        elif 21 <= sanity <= 40:
-            mod_base -= 2
-            mod_dice += 2
-        elif 41 <= sanity <= 45:
-            mod_base -= 3
-            mod_dice += 2
-
-    # Prevent dice from going below 1
-    mod_dice = max(1, mod_dice)
-    return mod_base, mod_dice
-
 # Helper function to roll ttrpg skills
 async def roll_skill_ttrpg(skill_data, sanity: int):
     _, skill_name, base_power, dice_power = skill_data
+    with phase("engine"):
+        result = roll_ttrpg(base_power, dice_power, sanity)
+    return result.total, result.roll, result.mod_base, result.mod_dice
+
+# Labels every slash command's task for metrics and times it end to end
+class MeteredTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        name = interaction.data.get("name", "unknown")
+        if interaction.type is discord.InteractionType.autocomplete:
+            name += ":autocomplete"
+        current_command.set(name)
+        interaction.extras["started"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command_errors.inc(current_command.get())
+        observe_total(interaction)
+        # Supabase is down and the replica doesn't have this user: say so instead of failing silently
+        if isinstance(getattr(error, "original", None), SupabaseUnavailable):
+            try:
+                await reply(interaction, str(error.original), ephemeral=True)
+            except discord.HTTPException:
+                pass
+            return
+        await super().on_error(interaction, error)
+
+def observe_total(interaction: discord.Interaction):
+    started = interaction.extras.get("started")
+    if started is not None:
+        seconds = time.perf_counter() - started
+        command_seconds.observe(seconds, current_command.get(), "total")
+        observe_latency(current_command.get(), seconds)
+
+# One process-wide bot, auto-sharded when sharding is configured
+if SHARDED:
+    bot = commands.AutoShardedBot(
+        command_prefix="!", intents=intents, tree_cls=MeteredTree, http_trace=metrics.discord_trace(),
+        shard_count=SHARD_COUNT, shard_ids=SHARD_IDS
+    )
+else:
+    bot = commands.Bot(
+        command_prefix="!", intents=intents, tree_cls=MeteredTree, http_trace=metrics.discord_trace()
+    )
+
+# Whether this process's shards receive a guild's interactions (DMs go to shard 0)
+def owns_guild(guild_id: int | None) -> bool:
+    shard_ids = getattr(bot, "shard_ids", None)
+    if not bot.shard_count or shard_ids is None:
+        return True
+    shard_id = (guild_id >> 22) % bot.shard_count if guild_id else 0
+    return shard_id in shard_ids
+
+Gauge("coinflips_clash_sessions_open", "Open clash challenges", lambda: len(clash_sessions))
+Gauge("coinflips_skill_cache_entries", "Users with cached skills", lambda: skill_cache.stats()["entries"])
+Gauge("coinflips_skill_cache_hit_rate", "Skill cache hit rate", lambda: skill_cache.stats()["hit_rate"])
+for _stat in ("hits", "misses", "evictions"):
+    Gauge(f"coinflips_skill_cache_{_stat}_total", f"Skill cache {_stat}",
+          lambda stat=_stat: skill_cache.stats()[stat], kind="counter")
+Gauge("coinflips_background_tasks", "Storage writes still in flight", lambda: len(background_tasks))
+Gauge("coinflips_supabase_breaker_state", "Supabase circuit breaker: 0 closed, 1 half open, 2 open",
+      lambda: ("closed", "half_open", "open").index(breaker.state))
+Gauge("coinflips_supabase_breaker_trips_total", "Times the Supabase breaker opened",
+      lambda: breaker.trips, kind="counter")
+Gauge("coinflips_replica_users", "Users with skills in the local replica", lambda: replica.user_count())
+Gauge("coinflips_pending_writes", "Skill writes queued for Supabase", lambda: replica.pending_count())
+Gauge("coinflips_shards", "Gateway shards run by this worker", lambda: len(getattr(bot, "shards", None) or [0]))
+
+# Start the loop-lag watcher and whichever metrics exporters are configured
+async def start_metrics():
+    run_in_background(metrics.watch_loop_lag(), "watching event loop lag")
+    if METRICS_PORT:
+        # Workers sharing a host each take the next port
+        port = METRICS_PORT + WORKER_INDEX
+        await metrics.serve(port)
+        print(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+    if METRICS_LOG_INTERVAL > 0:
+        run_in_background(metrics.log_periodically(METRICS_LOG_INTERVAL), "logging metrics")
+
+# Check the database schema without holding up the gateway connection
+async def check_schema():
+    ok, message = await verify_schema()
+    print(f"{'Schema OK' if ok else 'WARNING'}: {message}")
+
+# Runs once before connecting; anything that needs Supabase goes to the background
+@bot.event
+async def setup_hook():
+    await start_metrics()
+    run_in_background(check_schema(), "checking the database schema")
+    # Answer buttons on challenge messages posted before a restart
+    bot.add_view(ChallengeView())
+    run_in_background(restore_clash_sessions(), "restoring clash challenges")
+    reap_clash_sessions.start()
+    replay_writes.start()
+    if PRIMARY_WORKER:
+        run_in_background(sync_commands(), "syncing commands")
+
+# Stable hash of the command tree as it would be uploaded
+def tree_fingerprint(guild: discord.abc.Snowflake = None) -> str:
+    payload = sorted((c.to_dict(bot.tree) for c in bot.tree.get_commands(guild=guild)), key=lambda c: c["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+# Upload the command tree once per process, and only if it changed since the
+# last upload for this application and scope; reconnects never re-sync
+async def sync_commands():
+    if MODE == "test":
+        guild = discord.Object(id=GUILD_ID)
+        bot.tree.copy_global_to(guild=guild)
+        scope = f"{bot.application_id}:guild:{GUILD_ID}"
+    else:
+        guild = None
+        scope = f"{bot.application_id}:global"
+
+    fingerprint = tree_fingerprint(guild)
+    try:
+        synced = await load_command_fingerprint(scope)
+    except Exception as e:
+        print(f"WARNING: could not read the last command sync ({e}); syncing anyway")
+        synced = None
+
+    if synced == fingerprint:
+        print(f"Commands unchanged since the last sync ({scope}), skipping")
+        return
+
+    await bot.tree.sync(guild=guild)
+    print(f"Synced {len(bot.tree.get_commands(guild=guild))} commands ({scope})")
+    await save_command_fingerprint(scope, fingerprint)
+
+# clash_odds pulls in NumPy, so it is imported on first use or by warm_up(), off
+# the event loop; concurrent callers share one import
+clash_odds_import = None
 
-    mod_base, mod_dice = apply_sanity_mod(sanity, base_power, dice_power)
+async def load_clash_odds():
+    global clash_odds_import
+    if clash_odds_import is None:
+        clash_odds_import = asyncio.ensure_future(asyncio.to_thread(importlib.import_module, "clash_odds"))
+    return await clash_odds_import
 
-    dice_sign = 1 if dice_power >= 0 else -1
-    roll = random.randint(1, abs(mod_dice))
-    total = mod_base + (dice_sign * roll)
+# Get ready for the first commands: load NumPy and the odds tables, then cache
+# the skills of recently active users
+async def warm_up():
+    started = time.perf_counter()
+    clash_odds = await load_clash_odds()
+    await asyncio.to_thread(clash_odds.warm_tables)
 
-    return total, roll, mod_base, mod_dice
+    cached = 0
+    if WARM_USERS:
+        for table in (SKILLS_TABLE, TTRPG_SKILLS_TABLE):
+            cached += await warm_skill_cache(table, WARM_USERS)
+    print(f"Warm-up done in {time.perf_counter() - started:.2f}s ({cached} skill lists cached)")
 
-# Sync tree once the bot is ready
-bot = commands.Bot(command_prefix="!", intents=intents)
+warmed_up = False
 
 @bot.event
 async def on_ready():
+    global warmed_up
+    shards = f", shards {sorted(bot.shards)} of {bot.shard_count}" if SHARDED else ""
     if MODE == "test":
-        if GUILD_ID is None:
-            raise RuntimeError("GUILD_ID is required in test mode but was not set")
-
-        guild = discord.Object(id=GUILD_ID)
-        bot.tree.copy_global_to(guild=guild)
-        await bot.tree.sync(guild=guild)
-        print(f"Logged in as {bot.user} (TESTING)")
+        print(f"Logged in as {bot.user} (TESTING, worker {WORKER_INDEX}{shards})")
     else:
-        await bot.tree.sync()
-        print(f"Logged in as {bot.user} (GLOBAL)")
+        print(f"Logged in as {bot.user} (GLOBAL, worker {WORKER_INDEX}{shards})")
+
+    # on_ready fires again after reconnects; warm up only once
+    if not warmed_up:
+        warmed_up = True
+        run_in_background(warm_up(), "warming up")
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    observe_total(interaction)
+
+# Skill cache stats /Command
+@bot.tree.command(name="cache_stats", description="Show skill cache hit/miss counters")
+async def cache_stats_cmd(interaction: discord.Interaction):
+    stats = skill_cache.stats()
+    await interaction.response.send_message(
+        f"**__Skill Cache__**\n"
+        f"Entries: `{stats['entries']}`\n"
+        f"Hits: `{stats['hits']}` | Misses: `{stats['misses']}` | Evictions: `{stats['evictions']}`\n"
+        f"Hit Rate: `{stats['hit_rate']:.1%}`",
+        ephemeral=True
+    )
+
+# Clash Status /Command
+@bot.tree.command(name="clash_status", description="Show open clash challenges")
+async def clash_status_cmd(interaction: discord.Interaction):
+    now = time.time()
+    mine = sorted(clash_sessions.for_user(interaction.user.id), key=lambda s: s.expires_at)
+
+    lines = [
+        f"**{s.skill_name}** ({'Limbus' if s.kind == LIMBUS else 'TTRPG'}) in <#{s.channel_id}> "
+        f"— {max(0, int(s.expires_at - now))}s left"
+        for s in mine
+    ]
+    await interaction.response.send_message(
+        f"**__Open Clashes__**\n"
+        f"Yours: `{len(mine)}/{clash_sessions.per_user}`\n"
+        + ("\n".join(lines) + "\n" if lines else "")
+        + f"This channel: `{clash_sessions.count_channel(interaction.channel_id)}/{clash_sessions.per_channel}`\n"
+        f"Bot-wide: `{len(clash_sessions)}/{clash_sessions.total}` "
+        f"(opened `{clash_sessions.opened}`, expired `{clash_sessions.expired}`)",
+        ephemeral=True
+    )
 
 # ----------------------
 # Limbus Slash Commands
@@ -294,15 +837,21 @@ async def on_ready():
     coins="Total number of coins",
     unbreakable="How many unbreakable coins"
 )
+@deadline_aware(ephemeral=True)
 async def save_skill_cmd(interaction: discord.Interaction,
                          skill_name: str,
                          base_power: int,
                          coin_power: int,
-                         coins: int,
-                         unbreakable: int):
+                         coins: app_commands.Range[int, 0, MAX_COINS],
+                         unbreakable: app_commands.Range[int, 0, MAX_COINS]):
     user_id = str(interaction.user.id)
-    skill_id = save_skill(user_id, skill_name, base_power, coin_power, coins, unbreakable)
-    await interaction.response.send_message(
+    try:
+        skill_id = await save_skill(user_id, skill_name, base_power, coin_power, coins, unbreakable)
+    except SkillRejected as e:
+        await reply(interaction, f"Skill **{skill_name}** was not saved: {e}", ephemeral=True)
+        return
+
+    await reply(interaction,
         f"Skill **{skill_name}** saved! (ID: {skill_id})", ephemeral=True
     )
 
@@ -312,25 +861,27 @@ async def save_skill_cmd(interaction: discord.Interaction,
     skill_name="Name of the saved skill (optional if using ID)",
     skill_id="ID of the saved skill (optional if using name)"
 )
+@app_commands.autocomplete(skill_name=skill_autocomplete)
+@deadline_aware(ephemeral=True)
 async def delete_skill_cmd(interaction: discord.Interaction, skill_name: str = None, skill_id: int = None):
     user_id = str(interaction.user.id)
 
     if skill_name is None and skill_id is None:
-        await interaction.response.send_message(
+        await reply(interaction,
             "You must provide either a skill name or skill ID to delete.",
             ephemeral=True
         )
         return
 
-    deleted_name = delete_skill(user_id, skill_name=skill_name, skill_id=skill_id)
+    deleted_name = await delete_skill(user_id, skill_name=skill_name, skill_id=skill_id)
 
     if deleted_name is None:
-        await interaction.response.send_message(
+        await reply(interaction,
             "Skill not found. Check the name/ID and try again.",
             ephemeral=True
         )
     else:
-        await interaction.response.send_message(
+        await reply(interaction,
             f"Skill **{deleted_name}** has been deleted.",
             ephemeral=True
         )
@@ -342,15 +893,17 @@ async def delete_skill_cmd(interaction: discord.Interaction, skill_name: str = N
     skill_id="ID of the saved skill (optional if using name)",
     sanity="Sanity (-45 to 45)"
 )
+@app_commands.autocomplete(skill_name=skill_autocomplete)
+@deadline_aware()
 async def flip_cmd(interaction: discord.Interaction, sanity: int, skill_name: str = None, skill_id: int = None):
     user_id = str(interaction.user.id)
-    sanity = max(-45, min(45, sanity))  # clamp sanity
+    sanity = clamp_sanity(sanity)  # clamp sanity
 
     # Load skill by ID or by name
-    skill = load_skill(user_id, skill_name, skill_id)
+    skill = await load_skill(user_id, skill_name, skill_id)
 
     if skill is None:
-        await interaction.response.send_message(
+        await reply(interaction,
             "Skill not found. You can save a skill using save_skill. Check the name or ID and try again",
             ephemeral=True
         )
@@ -358,237 +911,189 @@ async def flip_cmd(interaction: discord.Interaction, sanity: int, skill_name: st
 
     # Unpack skill
     skill_name, base_power, coin_power, coins, unbreakable = skill
-    total_power = base_power
-    normal_coins = coins - unbreakable
-    head_chance = 50 + sanity
-    trail = ""
-
-    # Normal coins
-    for _ in range(normal_coins):
-        roll = random.randint(1, 100)
-        if roll <= head_chance:
-            total_power += coin_power
-            trail += f"{TAIL} "
-        else:
-            trail += f"{HEAD} "
-
-    # Unbreakable coins
-    for _ in range(unbreakable):
-        roll = random.randint(1, 100)
-        if roll <= head_chance:
-            total_power += coin_power
-            trail += f"{UNBREAKABLE_HEAD} "
-        else:
-            trail += f"{UNBREAKABLE_TAIL} "
+    spec = SkillSpec(base_power, coin_power, coins, unbreakable)
+    with phase("engine"):
+        flip = flip_coins(spec, spec.normal_coins, spec.unbreakable, sanity)
+        trail, total_power = flip.trail, flip.total
 
-    await interaction.response.send_message(
+    await reply(interaction,
         f"**{skill_name}** \n{trail}\n**Final Power:** {total_power}"
     )
 
+# Parse "name_or_id[:sanity], ..." into (ref, sanity) pairs; None means all skills
+def parse_skill_refs(text: str, default_sanity: int):
+    if text.strip().lower() == "all":
+        return None
+
+    refs = []
+    for entry in text.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        ref, sanity = entry, default_sanity
+        if ":" in entry:
+            head, tail = entry.rsplit(":", 1)
+            try:
+                ref, sanity = head.strip(), int(tail)
+            except ValueError:
+                pass
+        refs.append((int(ref) if ref.isdigit() else ref, clamp_sanity(sanity)))
+    return refs
+
+# Flip Many Skills /Command
+@bot.tree.command(name="flip_many", description="Flip several saved skills at once")
+@app_commands.describe(
+    skills='Skill names/IDs separated by commas, optionally with ":sanity" (e.g. "Slash:10, 3:-5"), or "all"',
+    sanity="Sanity for skills without their own (-45 to 45)"
+)
+@deadline_aware()
+async def flip_many_cmd(interaction: discord.Interaction, skills: str, sanity: int = 0):
+    user_id = str(interaction.user.id)
+    sanity = clamp_sanity(sanity)
+
+    refs = parse_skill_refs(skills, sanity)
+    if refs is not None and not refs:
+        await reply(interaction, "List at least one skill name or ID.", ephemeral=True)
+        return
+
+    # One storage lookup for every skill in the turn
+    loaded = await load_skills(user_id, None if refs is None else [ref for ref, _ in refs])
+    sanities = [sanity] * len(loaded) if refs is None else [s for _, s in refs]
+
+    blocks = []
+    for (ref, row), skill_sanity in zip(loaded, sanities):
+        if row is None:
+            blocks.append(f"**{ref}**: skill not found")
+            continue
+        spec = SkillSpec(row["base_power"], row["coin_power"], row["coins"], row["unbreakable"])
+        with phase("engine"):
+            flip = flip_coins(spec, spec.normal_coins, spec.unbreakable, skill_sanity)
+        blocks.append(
+            f"**{row['skill_name']}** (Sanity {skill_sanity})\n{flip.trail}\n**Final Power:** {flip.total}"
+        )
+
+    if not blocks:
+        await reply(interaction, "You have no saved skills.", ephemeral=True)
+        return
+
+    pages = paginate(blocks)
+    if len(pages) == 1:
+        await reply(interaction, pages[0])
+    else:
+        view = PageView(pages)
+        await reply(interaction, view.content(), view=view)
+
+# Skill List /Command
+@bot.tree.command(name="skill_list", description="View your list of saved skills")
+@deadline_aware(ephemeral=True)
+async def skill_list_cmd(interaction: discord.Interaction):
+    await send_skill_list(interaction, SKILLS_TABLE)
+
 # Clash / Command
 @bot.tree.command(name="clash", description="Clash your skill against another player's skill")
 @app_commands.describe(
     skill_name="Your saved skill name (optional if using ID)",
     skill_id="ID of your saved skill (optional if using name)",
-    sanity="Your sanity (-45 to 45)"
+    sanity="Your sanity (-45 to 45)",
+    live="Reveal the clash step by step in a single message"
 )
-async def clash_cmd(interaction: discord.Interaction, sanity: int, skill_name: str = None, skill_id: int = None):
-    original_user = interaction.user
-    user1_id = str(original_user.id)
-    sanity = max(-45, min(45, sanity))
+@app_commands.autocomplete(skill_name=skill_autocomplete)
+@deadline_aware()
+async def clash_cmd(interaction: discord.Interaction, sanity: int, skill_name: str = None, skill_id: int = None, live: bool = False):
+    user1_id = str(interaction.user.id)
+    sanity = clamp_sanity(sanity)
 
     # Load original user's skill
-    skill1 = load_skill(user1_id, skill_name, skill_id)
+    skill1 = await load_skill(user1_id, skill_name, skill_id)
     if not skill1:
-        await interaction.response.send_message(
+        await reply(interaction,
             "Your skill was not found. Save it first with /save_skill or check your input.",
             ephemeral=True
         )
         return
 
-    skill1_name, base_power1, coin_power1, coins1, unbreakable1 = skill1
-
-    # --- Challenge Button + Modal ---
-    class ChallengeView(View):
-        def __init__(self, original_user: discord.User):
-            super().__init__(timeout=30)
-            self.original_user = original_user
-            self.challenger_data = None  # Will hold challenger info once they join
-
-        @discord.ui.button(label="Join Clash", style=discord.ButtonStyle.primary)
-        async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
-            if interaction.user.id == self.original_user.id:
-                await interaction.response.send_message(
-                    "You can't challenge yourself!", ephemeral=True
-                )
-                return
-
-            parent_view = self
+    await open_challenge(interaction, LIMBUS, skill1, sanity, live)
 
-            # Challenger inputs sanity first, then skill
-            class ChallengeModal(discord.ui.Modal, title="Join Clash"):
-                sanity_input = discord.ui.TextInput(
-                    label="Sanity (-45 to 45)",
-                    placeholder="Enter your sanity first",
-                    required=True,
-                    max_length=5
-                )
-                skill_input = discord.ui.TextInput(
-                    label="Skill name or ID",
-                    placeholder="Enter your skill name or ID",
-                    required=True,
-                    max_length=50
-                )
-
-                async def on_submit(self_modal, modal_interaction: discord.Interaction):
-                    try:
-                        sanity_val = max(-45, min(45, int(self_modal.sanity_input.value)))
-                        skill_val = self_modal.skill_input.value.strip()
-                        challenger_id = str(modal_interaction.user.id)
-
-                        # Determine if input is ID or name
-                        if skill_val.isdigit():
-                            challenger_skill = load_skill(challenger_id, skill_id=int(skill_val))
-                        else:
-                            challenger_skill = load_skill(challenger_id, skill_name=skill_val)
-
-                        if not challenger_skill:
-                            await modal_interaction.response.send_message(
-                                f"Skill **{skill_val}** not found. Challenge cancelled.",
-                                ephemeral=True
-                            )
-                            parent_view.stop()
-                            return
-
-                        # Store all challenger info in the parent view
-                        skill_name, base_power, coin_power, coins, unbreakable = challenger_skill
-                        parent_view.challenger_data = (
-                            modal_interaction.user, skill_name, sanity_val,
-                            base_power, coin_power, coins, unbreakable
-                        )
-
-                        await modal_interaction.response.send_message(
-                            f"You joined the clash using **{skill_name}**!", ephemeral=True
-                        )
-                        parent_view.stop()
-
-                    except Exception:
-                        await modal_interaction.response.send_message(
-                            "Invalid input! Challenge cancelled.", ephemeral=True
-                        )
-                        parent_view.stop()
-
-            await interaction.response.send_modal(ChallengeModal())
-
-    view = ChallengeView(original_user)
-    await interaction.response.send_message(
-        f"⚔️ COMBAT START - CLASH\n{original_user.mention} uses **{skill1_name}**!\nWaiting for an opponent...",
-        view=view
-    )
+# Clash Odds /Command
+@bot.tree.command(name="clash_odds", description="Estimate your odds of winning a clash")
+@app_commands.describe(
+    sanity="Your sanity (-45 to 45)",
+    opponent_base_power="Opponent's base power",
+    opponent_coin_power="Opponent's coin power per head",
+    opponent_coins="Opponent's total number of coins",
+    opponent_unbreakable="Opponent's unbreakable coins",
+    opponent_sanity="Opponent's sanity (-45 to 45)",
+    skill_name="Your saved skill name (optional if using ID)",
+    skill_id="ID of your saved skill (optional if using name)",
+    exact="Compute the exact odds instead of simulating",
+    trials="Number of simulated clashes (when not exact)"
+)
+@app_commands.autocomplete(skill_name=skill_autocomplete)
+@deadline_aware()
+async def clash_odds_cmd(interaction: discord.Interaction,
+                         sanity: int,
+                         opponent_base_power: int,
+                         opponent_coin_power: int,
+                         opponent_coins: app_commands.Range[int, 0, MAX_COINS],
+                         opponent_unbreakable: app_commands.Range[int, 0, MAX_COINS] = 0,
+                         opponent_sanity: int = 0,
+                         skill_name: str = None,
+                         skill_id: int = None,
+                         exact: bool = True,
+                         trials: app_commands.Range[int, 1000, MAX_TRIALS] = DEFAULT_TRIALS):
+    user_id = str(interaction.user.id)
+    sanity = clamp_sanity(sanity)
+    opponent_sanity = clamp_sanity(opponent_sanity)
+    if opponent_unbreakable > opponent_coins:
+        await reply(interaction, "Unbreakable coins can't outnumber the opponent's coins.", ephemeral=True)
+        return
 
-    await view.wait()
-    if not view.challenger_data:
-        await interaction.edit_original_response(content="No one challenged in time. Clash cancelled.", view=None)
+    skill = await load_skill(user_id, skill_name, skill_id)
+    if skill is None:
+        await reply(interaction,
+            "Your skill was not found. Save it first with /save_skill or check your input.",
+            ephemeral=True
+        )
         return
 
-    # --- Both players ready ---
-    user2, skill2_name, sanity2, base_power2, coin_power2, coins2, unbreakable2 = view.challenger_data
-
-    # Initialize coin lists for both players
-    # 'U' = unbreakable, 'N' = normal
-    coins_list1 = ['N'] * (coins1 - unbreakable1) + ['U'] * unbreakable1
-    coins_list2 = ['N'] * (coins2 - unbreakable2) + ['U'] * unbreakable2
-
-    # Track removed unbreakables for post-clash flips
-    removed_unbreakables1 = 0
-    removed_unbreakables2 = 0
-
-    step_count = 1
-
-    # Clash loop: continue until one player has no coins left
-    while coins_list1 and coins_list2:
-        # Flip all coins for a player
-        def flip_all(coins_list, base_power, coin_power, sanity_val):
-            total = base_power
-            trail = ""
-            for c in coins_list:
-                roll = random.randint(1, 100)
-                if roll <= 50 + sanity_val:
-                    total += coin_power
-                    trail += TAIL + " " if c == 'N' else UNBREAKABLE_HEAD + " "
-                else:
-                    trail += HEAD + " " if c == 'N' else UNBREAKABLE_TAIL + " "
-            return total, trail
-
-        total1, trail1 = flip_all(coins_list1, base_power1, coin_power1, sanity)
-        total2, trail2 = flip_all(coins_list2, base_power2, coin_power2, sanity2)
-
-        # Determine loser of this clash step
-        if total1 > total2:
-            loser_list = coins_list2
-            loser_user = user2
-        elif total2 > total1:
-            loser_list = coins_list1
-            loser_user = original_user
+    skill_name, base_power, coin_power, coins, unbreakable = skill
+    spec = SkillSpec(base_power, coin_power, coins, unbreakable)
+    opponent = SkillSpec(opponent_base_power, opponent_coin_power, opponent_coins, opponent_unbreakable)
+
+    # Keep the solver/simulation off the event loop; large clashes are always simulated
+    with phase("engine"):
+        clash_odds = await load_clash_odds()
+        if exact and clash_odds.exact_is_cheap(spec, opponent):
+            odds = await asyncio.to_thread(clash_odds.exact_clash_odds, spec, sanity, opponent, opponent_sanity)
         else:
-            loser_list = None
-            loser_user = None
-
-        # Remove LEFTMOST coin from loser
-        if loser_list:
-            removed = loser_list.pop(0)
-            if removed == 'U':
-                if loser_list is coins_list1:
-                    removed_unbreakables1 += 1
-                else:
-                    removed_unbreakables2 += 1
-
-        # Display clash step
-        await interaction.followup.send(
-            f"**Clash Step {step_count}:**\n"
-            f"{original_user.display_name}: {trail1} ({total1})\n"
-            f"{user2.display_name}: {trail2} ({total2})\n"
-            + (f"Loser of this step: {loser_user.display_name}" if loser_user else "It's a tie!")
+            odds = await asyncio.to_thread(
+                clash_odds.simulate_clash_odds, spec, sanity, opponent, opponent_sanity, trials
+            )
+    percentile = clash_odds.distribution_percentile
+
+    if odds.power_distribution:
+        dist = odds.power_distribution
+        power_text = (
+            f"Expected Final Power: `{odds.expected_power:.2f}`\n"
+            f"Power Range (5%–95%): `{percentile(dist, 0.05)}`–`{percentile(dist, 0.95)}` "
+            f"(median `{percentile(dist, 0.5)}`)"
         )
-        step_count += 1
-
-    # --- Post-clash flips ---
-    # Determine winner/loser based on who still has coins left
-    if coins_list1:  # player 1 still has coins
-        winner, winner_list, winner_base, winner_coin, winner_sanity, winner_removed = \
-            original_user, coins_list1, base_power1, coin_power1, sanity, removed_unbreakables1
-        loser, loser_list, loser_base, loser_coin, loser_sanity, loser_removed = \
-            user2, coins_list2, base_power2, coin_power2, sanity2, removed_unbreakables2
-    else:  # player 2 still has coins
-        winner, winner_list, winner_base, winner_coin, winner_sanity, winner_removed = \
-            user2, coins_list2, base_power2, coin_power2, sanity2, removed_unbreakables2
-        loser, loser_list, loser_base, loser_coin, loser_sanity, loser_removed = \
-            original_user, coins_list1, base_power1, coin_power1, sanity, removed_unbreakables1
-
-    # Winner flips all remaining coins + any removed unbreakables
-    total_winner, trail_winner = flip_all(
-        winner_list + ['U'] * winner_removed,
-        winner_base,
-        winner_coin,
-        winner_sanity
-    )
-    await interaction.followup.send(
-        f"🏆 **{winner.display_name}** flips all remaining coins:\n{trail_winner}\nTotal Power: {total_winner}"
+    else:
+        power_text = "You never won a simulated clash."
+    stalemate_text = (
+        f"Stalemate Chance: **{odds.draw_probability:.1%}** (neither side can win)\n"
+        if odds.draw_probability else ""
     )
 
-    loser_unbreakables = unbreakable1 if loser == original_user else unbreakable2
-
-    # Loser flips all their unbreakable coins (always, regardless of what was lost)
-    if loser_unbreakables > 0:
-        total_loser, trail_loser = flip_all(
-            ['U'] * loser_unbreakables,
-            loser_base,
-            loser_coin,
-            loser_sanity
-        )
-        await interaction.followup.send(
-            f"💀 **{loser.display_name}** flips their unbreakable coins:\n{trail_loser}\nTotal Power: {total_loser}"
-        )
+    await reply(interaction,
+        f"**__Clash Odds__** ({f'{odds.trials:,} trials' if odds.trials else 'exact'})\n"
+        f"**{skill_name}** vs {opponent_base_power} + {opponent_coin_power} × {opponent_coins}"
+        + (f" ({opponent_unbreakable} unbreakable)" if opponent_unbreakable else "") + "\n"
+        f"Win Chance: **{odds.win_probability:.1%}**\n"
+        f"{stalemate_text}"
+        f"Average Clash Steps: `{odds.mean_steps:.2f}`\n"
+        f"{power_text}"
+    )
 
 # ----------------------
 # TTRPG Slash Commands
@@ -602,16 +1107,22 @@ async def clash_cmd(interaction: discord.Interaction, sanity: int, skill_name: s
     base_power="Base power of the skill",
     dice_power="Maximum dice roll (e.g. 1d8 --> 8)"
 )
+@deadline_aware(ephemeral=True)
 async def save_skill_ttrpg_cmd(
     interaction: discord.Interaction,
     skill_slot: int,
     skill_name: str,
     base_power: int,
-    dice_power: int
+    dice_power: app_commands.Range[int, -MAX_DICE, MAX_DICE]
 ):
     user_id = str(interaction.user.id)
-    skill_id = await save_skill_ttrpg(user_id, skill_slot, skill_name, base_power, dice_power)
-    await interaction.response.send_message(
+    try:
+        skill_id = await save_skill_ttrpg(user_id, skill_slot, skill_name, base_power, dice_power)
+    except SkillRejected as e:
+        await reply(interaction, f"TTRPG Skill **{skill_name}** was not saved: {e}", ephemeral=True)
+        return
+
+    await reply(interaction,
         f"TTRPG Skill **{skill_name}** saved in slot {skill_slot}! (ID: {skill_id})",
         ephemeral=True
     )
@@ -622,6 +1133,8 @@ async def save_skill_ttrpg_cmd(
     skill_name="Skill name (optional if using ID)",
     skill_id="Skill ID (optional if using name)"
 )
+@app_commands.autocomplete(skill_name=ttrpg_skill_autocomplete)
+@deadline_aware(ephemeral=True)
 async def delete_ttrpg_cmd(
     interaction: discord.Interaction,
     skill_name: str = None,
@@ -629,49 +1142,22 @@ async def delete_ttrpg_cmd(
 ):
     user_id = str(interaction.user.id)
     if not skill_name and not skill_id:
-        await interaction.response.send_message("Provide either skill name or ID!", ephemeral=True)
+        await reply(interaction, "Provide either skill name or ID!", ephemeral=True)
         return
 
     deleted = await delete_skill_ttrpg(user_id, skill_name, skill_id)
     if deleted:
-        await interaction.response.send_message(f"TTRPG Skill **{deleted}** deleted.", ephemeral=True)
+        await reply(interaction, f"TTRPG Skill **{deleted}** deleted.", ephemeral=True)
     else:
-        await interaction.response.send_message("Skill not found!", ephemeral=True)
+        await reply(interaction, "Skill not found!", ephemeral=True)
 
 
 # List TTRPG Skills
 
 @bot.tree.command(name="skill_list_ttrpg", description="View your list of TTRPG skills")
+@deadline_aware(ephemeral=True)
 async def skill_list_ttrpg_cmd(interaction: discord.Interaction):
-    user_id = str(interaction.user.id)
-
-    result = (
-        supabase.table("ttrpg_skills")
-        .select("user_skill_id, skill_slot, skill_name, base_power, dice_power")
-        .eq("user_id", user_id)
-        .order("skill_slot")
-        .execute()
-    )
-
-    if not result.data:
-        await interaction.response.send_message(
-            "You have no saved TTRPG skills.",
-            ephemeral=True
-        )
-        return
-
-    lines = []
-    for s in result.data:
-        dice = f"+ 1d{s['dice_power']}" if s["dice_power"] >= 0 else f"- 1d{abs(s['dice_power'])}"
-        lines.append(
-            f"**Slot {s['skill_slot']}** | ID `{s['user_skill_id']}`\n"
-            f"{s['skill_name']} → {s['base_power']} {dice}"
-        )
-
-    await interaction.response.send_message(
-        "**__TTRPG Skill List__**\n\n" + "\n\n".join(lines),
-        ephemeral=True
-    )
+    await send_skill_list(interaction, TTRPG_SKILLS_TABLE)
 
 # TTRPG Skill Info
 
@@ -680,6 +1166,8 @@ async def skill_list_ttrpg_cmd(interaction: discord.Interaction):
     skill_name="Skill name (optional if using ID)",
     skill_id="Skill ID (optional if using name)"
 )
+@app_commands.autocomplete(skill_name=ttrpg_skill_autocomplete)
+@deadline_aware(ephemeral=True)
 async def skill_info_ttrpg_cmd(
     interaction: discord.Interaction,
     skill_name: str = None,
@@ -689,13 +1177,13 @@ async def skill_info_ttrpg_cmd(
     skill = await load_skill_ttrpg(user_id, skill_name, skill_id)
 
     if not skill:
-        await interaction.response.send_message("Skill not found.", ephemeral=True)
+        await reply(interaction, "Skill not found.", ephemeral=True)
         return
 
     _, name, base, dice = skill
     dice_txt = f"1d{dice}" if dice >= 0 else f"-1d{abs(dice)}"
 
-    await interaction.response.send_message(
+    await reply(interaction,
         f"**__Skill Info__**\n\n"
         f"**{name}**\n"
         f"Base Power: `{base}`\n"
@@ -710,18 +1198,20 @@ async def skill_info_ttrpg_cmd(
     skill_id="Skill ID (optional if using name)",
     sanity="Sanity (-45 to 45)"
 )
+@app_commands.autocomplete(skill_name=ttrpg_skill_autocomplete)
+@deadline_aware()
 async def roll_ttrpg_cmd(
     interaction: discord.Interaction,
     sanity: int,
     skill_name: str = None,
     skill_id: int = None,
 ):
-    sanity = max(MIN_SANITY, min(MAX_SANITY, sanity))
+    sanity = clamp_sanity(sanity)
 
     user_id = str(interaction.user.id)
     skill = await load_skill_ttrpg(user_id, skill_name, skill_id)
     if not skill:
-        await interaction.response.send_message("Skill not found!", ephemeral=True)
+        await reply(interaction, "Skill not found!", ephemeral=True)
         return
 
     _, skill_name, base_power, dice_power = skill
@@ -730,7 +1220,7 @@ async def roll_ttrpg_cmd(
 
     dice_text = f"- 1d{mod_dice}" if dice_power < 0 else f"+ 1d{mod_dice}"
 
-    await interaction.response.send_message(
+    await reply(interaction,
         f"**{skill_name}**\n"
         f"{mod_base} {dice_text} ({roll}) → **Total: {total}**"
     )
@@ -742,108 +1232,177 @@ async def roll_ttrpg_cmd(
     skill_id="Your skill ID (optional if using name)",
     sanity="Your sanity (-45 to 45)"
 )
+@app_commands.autocomplete(skill_name=ttrpg_skill_autocomplete)
+@deadline_aware()
 async def clash_ttrpg_cmd(interaction: discord.Interaction, sanity: int, skill_name: str = None, skill_id: int = None):
-    original_user = interaction.user
-    user1_id = str(original_user.id)
-    sanity = max(MIN_SANITY, min(MAX_SANITY, sanity))
+    user1_id = str(interaction.user.id)
+    sanity = clamp_sanity(sanity)
 
     # Load original user's skill
     skill1 = await load_skill_ttrpg(user1_id, skill_name, skill_id)
     if not skill1:
-        await interaction.response.send_message(
+        await reply(interaction,
             "Your TTRPG skill was not found. Save it first with /save_skill_ttrpg or check your input.",
             ephemeral=True
         )
         return
 
-    _, skill1_name, base1, dice_power1 = skill1
-
-    # --- Challenge Button + Modal ---
-    class ChallengeView(View):
-        def __init__(self, original_user: discord.User):
-            super().__init__(timeout=30)
-            self.original_user = original_user
-            self.challenger_data = None
+    await open_challenge(interaction, TTRPG, skill1, sanity)
 
-        @discord.ui.button(label="Join Clash", style=discord.ButtonStyle.primary)
-        async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
-            if interaction.user.id == self.original_user.id:
-                await interaction.response.send_message("You can't challenge yourself!", ephemeral=True)
-                return
-
-            parent_view = self
+# TTRPG Clash Odds
+@bot.tree.command(name="clash_odds_ttrpg", description="Exact odds of winning a TTRPG clash")
+@app_commands.describe(
+    sanity="Your sanity (-45 to 45)",
+    opponent_base_power="Opponent's base power",
+    opponent_dice_power="Opponent's dice (e.g. 1d8 --> 8, -1d8 --> -8)",
+    opponent_sanity="Opponent's sanity (-45 to 45)",
+    skill_name="Your skill name (optional if using ID)",
+    skill_id="Your skill ID (optional if using name)"
+)
+@app_commands.autocomplete(skill_name=ttrpg_skill_autocomplete)
+@deadline_aware()
+async def clash_odds_ttrpg_cmd(
+    interaction: discord.Interaction,
+    sanity: int,
+    opponent_base_power: int,
+    opponent_dice_power: app_commands.Range[int, -MAX_DICE, MAX_DICE],
+    opponent_sanity: int = 0,
+    skill_name: str = None,
+    skill_id: int = None
+):
+    user_id = str(interaction.user.id)
+    sanity = clamp_sanity(sanity)
+    opponent_sanity = clamp_sanity(opponent_sanity)
 
-            class ChallengeModal(Modal, title="Join TTRPG Clash"):
-                sanity_input = TextInput(label="Sanity (-45 to 45)", placeholder="Enter your sanity first", required=True, max_length=5)
-                skill_input = TextInput(label="Skill name or ID", placeholder="Enter your skill name or ID", required=True, max_length=50)
+    skill = await load_skill_ttrpg(user_id, skill_name, skill_id)
+    if not skill:
+        await reply(interaction, "Skill not found!", ephemeral=True)
+        return
 
-                async def on_submit(self_modal, modal_interaction: Interaction):
-                    try:
-                        sanity_val = max(MIN_SANITY, min(MAX_SANITY, int(self_modal.sanity_input.value)))
-                        skill_val = self_modal.skill_input.value.strip()
-                        challenger_id = str(modal_interaction.user.id)
+    _, skill_name, base_power, dice_power = skill
+    # Skills saved before dice were capped
+    if abs(dice_power) > MAX_DICE:
+        await reply(interaction, f"**{skill_name}** uses a die bigger than 1d{MAX_DICE}; odds aren't supported.",
+                    ephemeral=True)
+        return
 
-                        if skill_val.isdigit():
-                            skill2 = await load_skill_ttrpg(challenger_id, skill_id=int(skill_val))
-                        else:
-                            skill2 = await load_skill_ttrpg(challenger_id, skill_name=skill_val)
+    with phase("engine"):
+        clash_odds = await load_clash_odds()
+        odds = await asyncio.to_thread(
+            clash_odds.exact_ttrpg_odds,
+            base_power, dice_power, sanity, opponent_base_power, opponent_dice_power, opponent_sanity
+        )
 
-                        if not skill2:
-                            await modal_interaction.response.send_message("Skill not found! Challenge cancelled.", ephemeral=True)
-                            parent_view.stop()
-                            return
+    if not odds.win_probability + odds.opponent_win_probability:
+        await reply(interaction,
+            f"**__TTRPG Clash Odds__** (exact)\n"
+            f"**{skill_name}** always ties {opponent_base_power} {'-' if opponent_dice_power < 0 else '+'} "
+            f"1d{abs(opponent_dice_power)}: the clash ends in a stalemate with no damage dealt."
+        )
+        return
 
-                        _, skill2_name, base2, dice2 = skill2
-                        parent_view.challenger_data = (modal_interaction.user, skill2_name, sanity_val, base2, dice2)
-                        await modal_interaction.response.send_message(f"You joined the clash with **{skill2_name}**!", ephemeral=True)
-                        parent_view.stop()
+    dist = odds.damage_distribution
+    percentile = clash_odds.distribution_percentile
+    damage = (
+        f"`{percentile(dist, 0.05)}`–`{percentile(dist, 0.95)}` (median `{percentile(dist, 0.5)}`)"
+    )
+    await reply(interaction,
+        f"**__TTRPG Clash Odds__** (exact)\n"
+        f"**{skill_name}** vs {opponent_base_power} {'-' if opponent_dice_power < 0 else '+'} 1d{abs(opponent_dice_power)}\n"
+        f"Win Chance: **{odds.win_probability:.1%}** (ties re-rolled {odds.tie_probability:.1%} of the time)\n"
+        f"Expected Damage Dealt: `{odds.expected_damage:.2f}`\n"
+        f"Damage Range (5%–95%): {damage}"
+    )
 
-                    except Exception:
-                        await modal_interaction.response.send_message("Invalid input! Challenge cancelled.", ephemeral=True)
-                        parent_view.stop()
+# ----------------------
+# Skill Sheet Commands
+# ----------------------
 
-            await interaction.response.send_modal(ChallengeModal())
+SHEET_TABLES = [
+    app_commands.Choice(name="Limbus", value=SKILLS_TABLE),
+    app_commands.Choice(name="TTRPG", value=TTRPG_SKILLS_TABLE),
+]
 
-    view = ChallengeView(original_user)
-    await interaction.response.send_message(
-        f"⚔️ CLASH START - {original_user.mention} uses **{skill1_name}**!\nWaiting for a challenger...",
-        view=view
-    )
+# Import Skills /Command
+@bot.tree.command(name="import_skills", description="Import a CSV or JSON sheet of skills")
+@app_commands.describe(
+    sheet="CSV or JSON file with one skill per row",
+    game="Which skill list to import into"
+)
+@app_commands.choices(game=SHEET_TABLES)
+@deadline_aware(ephemeral=True)
+async def import_skills_cmd(interaction: discord.Interaction,
+                            sheet: discord.Attachment,
+                            game: app_commands.Choice[str]):
+    user_id = str(interaction.user.id)
 
-    await view.wait()
-    if not view.challenger_data:
-        await interaction.edit_original_response(content="No one challenged in time. Clash cancelled.", view=None)
+    try:
+        check_sheet_size(sheet.size)
+        rows = validate_sheet(read_sheet(sheet.filename, await sheet.read()), game.value)
+    except SheetError as e:
+        problems = e.problems[:10] + ([f"...and {len(e.problems) - 10} more."] if len(e.problems) > 10 else [])
+        await reply(interaction,
+            "Import failed, nothing was saved:\n" + "\n".join(problems),
+            ephemeral=True
+        )
         return
 
-    # --- Both players ready ---
-    user2, skill2_name, sanity2, base2, dice_power2 = view.challenger_data
-
-    total1, roll1, mod_base1, mod_dice1 = await roll_skill_ttrpg(skill1, sanity)
-    total2, roll2, mod_base2, mod_dice2 = await roll_skill_ttrpg(
-        (None, skill2_name, base2, dice_power2), sanity2
-    )
+    try:
+        skill_ids = await insert_skills(game.value, user_id, rows)
+    except SkillRejected as e:
+        await reply(interaction, f"Import failed, nothing was saved: {e}", ephemeral=True)
+        return
 
-    while total1 == total2:
-        total1, roll1, mod_base1, mod_dice1 = await roll_skill_ttrpg(skill1, sanity)
-        total2, roll2, mod_base2, mod_dice2 = await roll_skill_ttrpg(
-            (None, skill2_name, base2, dice_power2), sanity2
+    await reply(interaction,
+        f"Imported **{len(skill_ids)}** {game.name} skills! (IDs {skill_ids[0]}–{skill_ids[-1]})",
+        ephemeral=True
     )
-    else: winner = original_user if total1 > total2 else user2
 
-    await interaction.followup.send(
-        f"{original_user.display_name}\n"
-        f"{mod_base1} + 1d{mod_dice1} ({roll1}) → **Total: {total1}**\n"
-        f"{user2.display_name}\n"
-        f"{mod_base2} + 1d{mod_dice2} ({roll2}) → **Total: {total2}**\n"
-    )
+# Export Skills /Command
+@bot.tree.command(name="export_skills", description="Export your skills as a CSV or JSON sheet")
+@app_commands.describe(
+    game="Which skill list to export",
+    fmt="File format"
+)
+@app_commands.choices(game=SHEET_TABLES, fmt=[
+    app_commands.Choice(name="CSV", value="csv"),
+    app_commands.Choice(name="JSON", value="json"),
+])
+@deadline_aware(ephemeral=True)
+async def export_skills_cmd(interaction: discord.Interaction,
+                            game: app_commands.Choice[str],
+                            fmt: app_commands.Choice[str] = None):
+    user_id = str(interaction.user.id)
+    fmt = fmt.value if fmt else "csv"
 
-    # Winner power dice
-    total_winner = total1 if total1 > total2 else total2
+    skills = await load_user_skills(user_id, game.value)
+    rows = skills.rows()
+    if not rows:
+        await reply(interaction, f"You have no saved {game.name} skills.", ephemeral=True)
+        return
 
-    await interaction.followup.send(
-        f"**{winner.display_name}**'s Damage Dealt: {total_winner}"
+    data = write_sheet(rows, game.value, fmt)
+    await reply(interaction,
+        f"Exported **{len(rows)}** {game.name} skills.",
+        file=discord.File(io.BytesIO(data), filename=f"{game.value}.{fmt}"),
+        ephemeral=True
     )
 
 
-# Run the bot
-bot.run(TOKEN)
\ No newline at end of file
+# Every problem with the environment, found before connecting to anything
+def validate_config():
+    config.require("DISCORD_TOKEN", "SUPABASE_URL", "SUPABASE_KEY")
+    if MODE == "test" and env_str("GUILD_ID") is None:
+        config.problems.append("GUILD_ID is required when BOT_MODE is test (the default)")
+    url = env_str("SUPABASE_URL")
+    if url and not url.startswith(("https://", "http://")):
+        config.problems.append(f"SUPABASE_URL must be an http(s) URL (got {url!r})")
+    config.check()
+
+# Run the bot (importing this module, e.g. from loadtest.py, doesn't connect)
+if __name__ == "__main__":
+    try:
+        validate_config()
+    except ConfigError as e:
+        sys.exit(str(e))
+    bot.run(TOKEN)
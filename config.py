@@ -0,0 +1,73 @@
+import os
+from functools import cache
+
+# Every bad or missing setting found so far; check() reports them all at once
+problems: list[str] = []
+
+
+# Raised by check(); the message lists every problem
+class ConfigError(RuntimeError):
+    pass
+
+
+def env_str(name: str, default: str | None = None) -> str | None:
+    value = os.getenv(name)
+    return value.strip() if value and value.strip() else default
+
+
+# Read an integer setting, recording a problem (and using the default) if it is bad
+def env_int(name: str, default, minimum: int | None = None):
+    raw = env_str(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        problems.append(f"{name} must be a whole number (got {raw!r})")
+        return default
+    if minimum is not None and value < minimum:
+        problems.append(f"{name} must be at least {minimum} (got {value})")
+        return default
+    return value
+
+
+def env_float(name: str, default: float, minimum: float | None = None) -> float:
+    raw = env_str(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        problems.append(f"{name} must be a number (got {raw!r})")
+        return default
+    if minimum is not None and value < minimum:
+        problems.append(f"{name} must be at least {minimum} (got {value})")
+        return default
+    return value
+
+
+def env_flag(name: str) -> bool:
+    return (env_str(name) or "").lower() in ("1", "true", "yes")
+
+
+# This process's place among WORKER_COUNT workers (WORKER_INDEX, or Heroku's DYNO=worker.N)
+@cache
+def worker_index() -> int:
+    dyno = env_str("DYNO", "")
+    if dyno.startswith("worker.") and dyno[7:].isdigit():
+        default = int(dyno[7:]) - 1
+    else:
+        default = 0
+    return env_int("WORKER_INDEX", default, minimum=0)
+
+
+# Record a problem for each setting that isn't set
+def require(*names: str):
+    for name in names:
+        if env_str(name) is None:
+            problems.append(f"{name} is not set")
+
+
+def check():
+    if problems:
+        raise ConfigError("Invalid configuration:\n" + "\n".join(f"  - {p}" for p in problems))
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+from collections import deque
+
+import discord
+
+from config import env_float
+from metrics import command_deferrals, command_timeouts, current_command
+
+# Discord fails an interaction that isn't answered within 3 seconds of creation
+RESPONSE_DEADLINE = 3.0
+# Defer once this much of the deadline has gone by without a reply
+DEFER_AFTER = env_float("DEFER_AFTER", 1.5, minimum=0)
+# Defer straight away when a command's recent p90 is slower than this
+PREDICT_SLOW_AFTER = env_float("PREDICT_SLOW_AFTER", 1.0, minimum=0)
+# Observations needed before a command's p90 is trusted
+PREDICT_MIN_SAMPLES = 20
+# Only the most recent observations count, so a command that got faster (or
+# slower) is judged on how it runs now rather than since startup
+PREDICT_WINDOW = 100
+# Give up on a command's work after this long
+COMMAND_TIMEOUT = env_float("COMMAND_TIMEOUT", 10.0, minimum=1)
+
+TIMEOUT_TEXT = "That took too long and was cancelled. Please try again."
+
+# ----------------------
+# Replies
+# ----------------------
+
+# One lock per interaction so a deferral never races a reply
+def _response_lock(interaction: discord.Interaction) -> asyncio.Lock:
+    lock = interaction.extras.get("response_lock")
+    if lock is None:
+        lock = interaction.extras["response_lock"] = asyncio.Lock()
+    return lock
+
+
+# Acknowledge now and answer later: "thinking..." for commands, a silent
+# deferred update for components whose message gets edited
+async def defer(interaction: discord.Interaction, ephemeral: bool = False, update: bool = False):
+    async with _response_lock(interaction):
+        if interaction.response.is_done():
+            return
+        if update:
+            await interaction.response.defer()
+            interaction.extras["deferred"] = "update"
+        else:
+            await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+            interaction.extras["deferred"] = "ephemeral" if ephemeral else "public"
+        command_deferrals.inc(current_command.get())
+
+
+# Send a reply, as a followup if the interaction was already deferred
+async def reply(interaction: discord.Interaction, content=None, *, ephemeral: bool = False, **kwargs):
+    async with _response_lock(interaction):
+        if not interaction.response.is_done():
+            return await interaction.response.send_message(content, ephemeral=ephemeral, **kwargs)
+
+        # The first followup replaces a public "thinking..." placeholder and would
+        # be public too; drop the placeholder so a private reply stays private
+        if ephemeral and interaction.extras.get("deferred") == "public" and not interaction.extras.get("followed_up"):
+            await interaction.delete_original_response()
+        interaction.extras["followed_up"] = True
+        return await interaction.followup.send(content, ephemeral=ephemeral, wait=True, **kwargs)
+
+
+# Edit the message a component or modal came from, deferred or not
+async def edit_response(interaction: discord.Interaction, **kwargs):
+    async with _response_lock(interaction):
+        if interaction.response.is_done():
+            return await interaction.edit_original_response(**kwargs)
+        return await interaction.response.edit_message(**kwargs)
+
+
+# Message ID of whatever reply() returned
+def message_id(sent) -> int:
+    return getattr(sent, "message_id", None) or sent.id
+
+# ----------------------
+# Deadlines
+# ----------------------
+
+# command -> its most recent total times
+_recent_seconds: dict[str, deque[float]] = {}
+
+
+def observe_latency(command: str, seconds: float):
+    samples = _recent_seconds.get(command)
+    if samples is None:
+        samples = _recent_seconds[command] = deque(maxlen=PREDICT_WINDOW)
+    samples.append(seconds)
+
+
+def predicted_slow(command: str) -> bool:
+    samples = _recent_seconds.get(command)
+    if samples is None or len(samples) < PREDICT_MIN_SAMPLES:
+        return False
+    return sorted(samples)[int(0.9 * (len(samples) - 1))] > PREDICT_SLOW_AFTER
+
+
+async def _defer_when_late(interaction: discord.Interaction, ephemeral: bool, update: bool):
+    created = getattr(interaction, "created_at", None)
+    elapsed = (discord.utils.utcnow() - created).total_seconds() if created else 0.0
+    await asyncio.sleep(max(0.0, DEFER_AFTER - elapsed))
+    try:
+        await defer(interaction, ephemeral, update)
+    except discord.HTTPException:
+        pass
+
+
+# Run an interaction's work against its deadline: defer up front if the command
+# is usually slow, defer anyway if no reply has gone out by DEFER_AFTER, and
+# cancel the work after `timeout` seconds
+async def run_with_deadline(interaction: discord.Interaction, work, *, ephemeral: bool = False,
+                            update: bool = False, timeout: float = COMMAND_TIMEOUT):
+    command = current_command.get()
+    if predicted_slow(command):
+        await defer(interaction, ephemeral, update)
+
+    watchdog = asyncio.create_task(_defer_when_late(interaction, ephemeral, update))
+    try:
+        return await asyncio.wait_for(work, timeout)
+    except asyncio.TimeoutError:
+        command_timeouts.inc(command)
+        await reply(interaction, TIMEOUT_TEXT, ephemeral=True)
+    finally:
+        watchdog.cancel()
+
+
+# Slash command decorator for run_with_deadline; `ephemeral` should match the
+# command's normal reply so a deferral shows up in the same place
+def deadline_aware(ephemeral: bool = False, timeout: float = COMMAND_TIMEOUT):
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(interaction: discord.Interaction, *args, **kwargs):
+            return await run_with_deadline(
+                interaction, func(interaction, *args, **kwargs), ephemeral=ephemeral, timeout=timeout
+            )
+        return wrapper
+    return decorate
@@ -0,0 +1,477 @@
+# Offline load test for the slash command handlers in coinflips.py.
+# Drives every command through fake Discord interactions against an in-memory
+# stand-in for the Supabase tables with injected latency, and reports
+# throughput, p50/p99 latency and event-loop blocking per command.
+#
+#   python loadtest.py --users 50 --iterations 20 --latency 0.05
+#   python loadtest.py --save baseline.json
+#   python loadtest.py --compare baseline.json --tolerance 0.2
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+import discord
+import httpx
+from discord import app_commands
+from postgrest.exceptions import APIError
+
+import storage
+from storage import SCHEMA_VERSION, SKILLS_TABLE, TTRPG_SKILLS_TABLE, UNIQUE_VIOLATION
+import coinflips
+from metrics import current_command
+from replica import SkillReplica
+
+# How often the lag watcher wakes while a command is being driven
+LAG_INTERVAL = 0.005
+
+# ----------------------
+# In-Memory Supabase
+# ----------------------
+
+# Just enough of the PostgREST query builder for storage.py
+class FakeQuery:
+    def __init__(self, db, table: str):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.ordering = None
+        self.row_limit = None
+        self.action = "select"
+        self.payload = None
+
+    def select(self, *columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    # PostgREST ILIKE: `*` and `%` match any run, `_` one character, `\` escapes
+    # (except `*`, which PostgREST rewrites to `%` before Postgres sees it)
+    def ilike(self, column, pattern):
+        regex = ""
+        for escaped, char in re.findall(r"(\\)?(.)", pattern.replace("*", "%"), re.S):
+            if escaped:
+                regex += re.escape(char)
+            else:
+                regex += {"%": ".*", "_": "."}.get(char) or re.escape(char)
+        compiled = re.compile(regex, re.I | re.S)
+        self.filters.append(lambda r: compiled.fullmatch(r.get(column, "")) is not None)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: r.get(column) > value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda r: r.get(column) < value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def upsert(self, row):
+        self.action = "upsert"
+        self.payload = row
+        return self
+
+    async def execute(self):
+        await self.db.wait()
+        rows = self.db.tables.setdefault(self.table, [])
+
+        if self.action == "upsert":
+            key = "session_id"
+            rows[:] = [r for r in rows if r.get(key) != self.payload.get(key)]
+            rows.append(dict(self.payload))
+            return SimpleNamespace(data=[self.payload])
+
+        matched = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.action == "delete":
+            rows[:] = [r for r in rows if r not in matched]
+            return SimpleNamespace(data=matched)
+
+        if self.ordering:
+            column, desc = self.ordering
+            matched.sort(key=lambda r: r[column], reverse=desc)
+        if self.row_limit is not None:
+            matched = matched[:self.row_limit]
+        return SimpleNamespace(data=[dict(r) for r in matched])
+
+
+# The insert_skill(s) stored functions from migrations/0001 and 0002
+class FakeRpc:
+    TABLES = {
+        "insert_skill": SKILLS_TABLE,
+        "insert_skills": SKILLS_TABLE,
+        "insert_skill_ttrpg": TTRPG_SKILLS_TABLE,
+        "insert_skills_ttrpg": TTRPG_SKILLS_TABLE,
+    }
+
+    def __init__(self, db, name: str, params: dict):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    async def execute(self):
+        await self.db.wait()
+        table = self.TABLES[self.name]
+        user_id = self.params["p_user_id"]
+        if "p_skills" in self.params:
+            skills = self.params["p_skills"]
+        else:
+            skills = [{k[2:]: v for k, v in self.params.items() if k != "p_user_id"}]
+
+        rows = self.db.tables.setdefault(table, [])
+        mine = [r for r in rows if r["user_id"] == user_id]
+        taken = {r["skill_name"].lower() for r in mine}
+        if any(s["skill_name"].lower() in taken for s in skills):
+            raise APIError({"code": UNIQUE_VIOLATION, "message": "duplicate skill name"})
+
+        next_id = max((r["user_skill_id"] for r in mine), default=0) + 1
+        ids = list(range(next_id, next_id + len(skills)))
+        for user_skill_id, skill in zip(ids, skills):
+            rows.append({"id": next(self.db.identity), "user_id": user_id, "user_skill_id": user_skill_id, **skill})
+        return SimpleNamespace(data=ids if "p_skills" in self.params else ids[0])
+
+
+class FakeSupabase:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self.down = False
+        self.identity = itertools.count(1)
+        self.tables = {"schema_migrations": [{"version": SCHEMA_VERSION}]}
+
+    async def wait(self):
+        self.calls += 1
+        if self.down:
+            raise httpx.ConnectError("Supabase is down")
+        delay = self.latency * (1 + random.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(max(0.0, delay))
+
+    def table(self, name: str):
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict):
+        return FakeRpc(self, name, params)
+
+# ----------------------
+# Fake Discord Interactions
+# ----------------------
+
+_message_ids = itertools.count(1)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _reply(self, content=None, **kwargs):
+        await asyncio.sleep(self.interaction.discord_latency)
+        self._done = True
+        self.interaction.sent.append(content)
+        return SimpleNamespace(message_id=next(_message_ids))
+
+    send_message = edit_message = _reply
+
+    async def defer(self, **kwargs):
+        await self._reply()
+
+    async def send_modal(self, modal):
+        await self._reply()
+
+
+class FakeInteraction:
+    def __init__(self, user_id: int, command: str, discord_latency: float = 0.0, message_id: int = None):
+        self.user = SimpleNamespace(
+            id=user_id, name=f"user{user_id}", display_name=f"User {user_id}", mention=f"<@{user_id}>"
+        )
+        self.channel_id = 1000 + user_id % 50
+        self.guild_id = None
+        self.data = {"name": command}
+        self.type = discord.InteractionType.application_command
+        self.message = SimpleNamespace(id=message_id)
+        self.created_at = discord.utils.utcnow()
+        self.extras = {}
+        self.discord_latency = discord_latency
+        self.sent = []
+        self.response = FakeResponse(self)
+        self.followup = SimpleNamespace(send=self.response._reply)
+
+    async def edit_original_response(self, content=None, **kwargs):
+        return await self.response._reply(content)
+
+    async def delete_original_response(self):
+        await asyncio.sleep(self.discord_latency)
+
+
+class FakeAttachment:
+    def __init__(self, filename: str, data: bytes):
+        self.filename = filename
+        self.data = data
+        self.size = len(data)
+
+    async def read(self) -> bytes:
+        return self.data
+
+# ----------------------
+# Scenarios
+# ----------------------
+
+LIMBUS_CHOICE = app_commands.Choice(name="Limbus", value=SKILLS_TABLE)
+TTRPG_CHOICE = app_commands.Choice(name="TTRPG", value=TTRPG_SKILLS_TABLE)
+SEED_SKILLS = 25
+
+
+def callback(name: str):
+    return coinflips.bot.tree.get_command(name).callback
+
+
+# Give every user a full skill list in both tables before measuring
+async def seed_users(users: int):
+    for user in range(1, users + 1):
+        user_id = str(user)
+        await storage.insert_skills(SKILLS_TABLE, user_id, [
+            {"skill_name": f"Skill {k}", "base_power": 4 + k % 5, "coin_power": 2 + k % 3,
+             "coins": 1 + k % 4, "unbreakable": k % 2}
+            for k in range(1, SEED_SKILLS + 1)
+        ])
+        await storage.insert_skills(TTRPG_SKILLS_TABLE, user_id, [
+            {"skill_slot": 1 + k % 3, "skill_name": f"Skill {k}", "base_power": k % 6, "dice_power": 4 + 2 * (k % 4)}
+            for k in range(1, SEED_SKILLS + 1)
+        ])
+
+
+# Open a challenge as `user` and have the next user join it through the modal
+async def clash_round(user: int, i: int, kind: str, users: int, discord_latency: float):
+    command = "clash" if kind == coinflips.LIMBUS else "clash_ttrpg"
+    interaction = FakeInteraction(user, command, discord_latency)
+    await callback(command)(interaction, sanity=random.randint(-45, 45), skill_name=f"Skill {1 + i % SEED_SKILLS}")
+    sessions = coinflips.clash_sessions.for_user(user)
+    if not sessions:
+        return
+    session = max(sessions, key=lambda s: s.expires_at)
+
+    opponent = FakeInteraction(user % users + 1, command, discord_latency, session.message_id)
+    modal = coinflips.ChallengeModal(session)
+    modal.sanity_input._refresh_state(opponent, {"value": str(random.randint(-45, 45))})
+    modal.skill_input._refresh_state(opponent, {"value": f"Skill {1 + (i + 7) % SEED_SKILLS}"})
+    await modal.on_submit(opponent)
+
+
+def sheet(user: int, i: int) -> FakeAttachment:
+    lines = ["skill_name,base_power,coin_power,coins,unbreakable"]
+    lines += [f"Import {user}-{i}-{k},5,3,3,1" for k in range(20)]
+    return FakeAttachment("skills.csv", "\n".join(lines).encode())
+
+
+# (command label, async fn(user, iteration, discord_latency)); destructive ones run last
+def scenarios(users: int):
+    def call(name, label=None, **kwargs):
+        async def run(user, i, lat):
+            args = {k: v(user, i) if callable(v) else v for k, v in kwargs.items()}
+            await callback(name)(FakeInteraction(user, name, lat), **args)
+        return label or name, run
+
+    def autocomplete(name, fn):
+        async def run(user, i, lat):
+            await fn(FakeInteraction(user, name, lat), "Ski")
+        return f"{name}:autocomplete", run
+
+    def skill(user, i):
+        return f"Skill {1 + i % SEED_SKILLS}"
+
+    return [
+        call("save_skill", skill_name=lambda u, i: f"Bench {i}", base_power=5, coin_power=3, coins=3, unbreakable=0),
+        call("save_skill_ttrpg", skill_slot=1, skill_name=lambda u, i: f"Bench {i}", base_power=3, dice_power=8),
+        call("flip_skill", sanity=0, skill_name=skill),
+        call("flip_many", skills="all", sanity=10),
+        autocomplete("flip_skill", coinflips.skill_autocomplete),
+        call("skill_list"),
+        call("skill_list_ttrpg"),
+        call("skill_info_ttrpg", skill_name=skill),
+        call("roll_skill_ttrpg", sanity=-20, skill_name=skill),
+        call("clash_odds", sanity=15, opponent_base_power=5, opponent_coin_power=4,
+             opponent_coins=3, skill_name=skill),
+        call("clash_odds_ttrpg", sanity=15, opponent_base_power=3, opponent_dice_power=8, skill_name=skill),
+        ("clash", lambda u, i, lat: clash_round(u, i, coinflips.LIMBUS, users, lat)),
+        ("clash_ttrpg", lambda u, i, lat: clash_round(u, i, coinflips.TTRPG, users, lat)),
+        call("clash_status"),
+        call("cache_stats"),
+        call("import_skills", sheet=sheet, game=LIMBUS_CHOICE),
+        call("export_skills", game=LIMBUS_CHOICE),
+        call("export_skills", "export_skills:ttrpg", game=TTRPG_CHOICE),
+        call("delete_skill", skill_name=lambda u, i: f"Bench {i}"),
+        call("delete_skill_ttrpg", skill_name=lambda u, i: f"Bench {i}"),
+    ]
+
+# ----------------------
+# Runner
+# ----------------------
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# Sample how late the loop wakes us until `stop` is set
+async def watch_lag(samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - start - LAG_INTERVAL))
+
+
+# Drive one command with `users` concurrent users, `iterations` calls each
+async def bench(label: str, run, users: int, iterations: int, discord_latency: float, cold: bool) -> dict:
+    latencies = []
+    errors = 0
+
+    async def user_loop(user: int):
+        nonlocal errors
+        current_command.set(label)
+        for i in range(iterations):
+            if cold:
+                storage.skill_cache.invalidate(str(user), SKILLS_TABLE)
+                storage.skill_cache.invalidate(str(user), TTRPG_SKILLS_TABLE)
+            start = time.perf_counter()
+            try:
+                await run(user, i, discord_latency)
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"  {label}: {type(e).__name__}: {e}", file=sys.stderr)
+            latencies.append(time.perf_counter() - start)
+
+    lag = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_lag(lag, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(user_loop(user) for user in range(1, users + 1)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await watcher
+
+    return {
+        "command": label,
+        "ops": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_lag_ms": max(lag, default=0.0) * 1000,
+        "p99_lag_ms": percentile(lag, 0.99) * 1000,
+    }
+
+
+def print_report(results: list[dict]):
+    print(f"{'command':<28}{'ops':>7}{'err':>5}{'ops/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'lag p99':>9}{'lag max':>9}")
+    for r in results:
+        print(f"{r['command']:<28}{r['ops']:>7}{r['errors']:>5}{r['throughput']:>10.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['p99_lag_ms']:>9.1f}{r['max_lag_ms']:>9.1f}")
+
+
+# Commands whose p99 or throughput got worse than `tolerance` against a saved run
+def regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    before = {r["command"]: r for r in baseline}
+    problems = []
+    for r in results:
+        old = before.get(r["command"])
+        if old is None:
+            continue
+        if r["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            problems.append(f"{r['command']}: p99 {old['p99_ms']:.1f} -> {r['p99_ms']:.1f} ms")
+        if r["throughput"] < old["throughput"] * (1 - tolerance):
+            problems.append(f"{r['command']}: throughput {old['throughput']:.1f} -> {r['throughput']:.1f} ops/s")
+        if r["errors"] > old["errors"]:
+            problems.append(f"{r['command']}: errors {old['errors']} -> {r['errors']}")
+    return problems
+
+
+async def main(args) -> int:
+    random.seed(args.seed)
+    storage._client = FakeSupabase(args.latency, args.jitter)
+    storage.replica = SkillReplica(":memory:")
+    # The bench drives many challenges per user at once
+    coinflips.clash_sessions.per_user = coinflips.clash_sessions.per_channel = coinflips.clash_sessions.total = 10 ** 9
+
+    await seed_users(args.users)
+    if args.outage:
+        # Replicate every user, then take Supabase down for the whole run
+        for user in range(1, args.users + 1):
+            for table in (SKILLS_TABLE, TTRPG_SKILLS_TABLE):
+                await storage.load_user_skills(str(user), table)
+        storage._client.down = True
+
+    results = []
+    for label, run in scenarios(args.users):
+        if args.only and label.split(":")[0] not in args.only:
+            continue
+        results.append(await bench(label, run, args.users, args.iterations, args.discord_latency, args.cold))
+
+    # Let background storage writes (clash session rows) finish
+    if coinflips.background_tasks:
+        await asyncio.wait(list(coinflips.background_tasks), timeout=5)
+
+    print(f"{args.users} users x {args.iterations} iterations, "
+          f"supabase latency {args.latency * 1000:.0f} ms ±{args.jitter:.0%}, "
+          f"discord latency {args.discord_latency * 1000:.0f} ms{', cold cache' if args.cold else ''}"
+          f"{', Supabase down' if args.outage else ''}")
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            problems = regressions(results, json.load(f), args.tolerance)
+        if problems:
+            print("\nRegressions:\n" + "\n".join(problems))
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test for the coinflips slash commands")
+    parser.add_argument("--users", type=int, default=20, help="concurrent users")
+    parser.add_argument("--iterations", type=int, default=10, help="calls per user per command")
+    parser.add_argument("--latency", type=float, default=0.03, help="Supabase round trip in seconds")
+    parser.add_argument("--jitter", type=float, default=0.5, help="± fraction of latency")
+    parser.add_argument("--discord-latency", type=float, default=0.05, help="Discord reply round trip in seconds")
+    parser.add_argument("--cold", action="store_true", help="drop cached skills before every call")
+    parser.add_argument("--outage", action="store_true", help="run with Supabase unreachable (replica only)")
+    parser.add_argument("--only", nargs="*", help="only run these commands")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression fraction")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Slash command (or component) the current task is serving; set per interaction
+current_command = ContextVar("current_command", default="background")
+
+# Upper bounds in seconds; Discord's initial-response deadline is 3s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def _label_text(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+# ----------------------
+# Metric Types
+# ----------------------
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def lines(self):
+        for label_values, value in sorted(self.values.items()):
+            yield f"{self.name}{_label_text(self.labels, label_values)} {value}"
+
+    def snapshot(self):
+        return {",".join(map(str, k)) or "total": v for k, v in sorted(self.values.items())}
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+inf last), sum, count]
+        self.values: dict[tuple, list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *label_values):
+        entry = self.values.get(label_values)
+        if entry is None:
+            entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        counts = entry[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def count(self, *label_values) -> int:
+        entry = self.values.get(label_values)
+        return entry[2] if entry else 0
+
+    # Upper bound of the bucket holding the q-th observation (inf past the last bucket)
+    def quantile(self, q: float, *label_values) -> float | None:
+        entry = self.values.get(label_values)
+        if entry is None or not entry[2]:
+            return None
+        rank = q * entry[2]
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), entry[0]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def lines(self):
+        for label_values, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                yield (f"{self.name}_bucket"
+                       f"{_label_text(self.labels + ('le',), label_values + (bound,))} {cumulative}")
+            yield f"{self.name}_sum{_label_text(self.labels, label_values)} {total}"
+            yield f"{self.name}_count{_label_text(self.labels, label_values)} {count}"
+
+    def snapshot(self):
+        return {
+            ",".join(map(str, k)) or "total": {
+                "count": count,
+                "mean": total / count,
+                "p50": self.quantile(0.5, *k),
+                "p99": self.quantile(0.99, *k),
+            }
+            for k, (_, total, count) in sorted(self.values.items()) if count
+        }
+
+
+# A value read from elsewhere (cache stats, registry size) whenever metrics are collected
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def lines(self):
+        yield f"{self.name} {self.read()}"
+
+    def snapshot(self):
+        return self.read()
+
+# ----------------------
+# Bot Metrics
+# ----------------------
+
+command_seconds = Histogram(
+    "coinflips_command_seconds",
+    "Time per interaction, split into supabase, engine, discord and total phases",
+    ("command", "phase")
+)
+command_errors = Counter("coinflips_command_errors_total", "Interactions that raised", ("command",))
+command_deferrals = Counter("coinflips_command_deferrals_total", "Interactions deferred to beat the deadline", ("command",))
+command_timeouts = Counter("coinflips_command_timeouts_total", "Interactions cancelled for taking too long", ("command",))
+supabase_errors = Counter("coinflips_supabase_errors_total", "PostgREST errors by Postgres code", ("code",))
+supabase_timeouts = Counter("coinflips_supabase_timeouts_total", "Supabase requests that timed out")
+replica_reads = Counter("coinflips_replica_reads_total", "Skill reads served from the local replica", ("reason",))
+replayed_writes = Counter("coinflips_replayed_writes_total", "Queued writes sent to Supabase after an outage", ("result",))
+loop_lag = Histogram(
+    "coinflips_event_loop_lag_seconds",
+    "How late the event loop woke a sleeping watcher task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+
+# Time one phase of the interaction the current task is serving
+def phase(name: str):
+    return command_seconds.time(current_command.get(), name)
+
+
+# Prometheus text exposition format
+def render() -> str:
+    out = []
+    for metric in REGISTRY:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.lines())
+    return "\n".join(out) + "\n"
+
+
+def snapshot() -> dict:
+    return {metric.name: metric.snapshot() for metric in REGISTRY}
+
+
+# aiohttp trace hooks that time every Discord HTTP request (pass as http_trace=)
+def discord_trace():
+    import aiohttp
+
+    async def on_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_end(session, ctx, params):
+        command_seconds.observe(time.perf_counter() - ctx.start, current_command.get(), "discord")
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    trace.on_request_exception.append(on_end)
+    return trace
+
+# ----------------------
+# Exporters
+# ----------------------
+
+# Serve GET /metrics on a local port
+async def serve(port: int, host: str = "127.0.0.1"):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.split()
+            if len(parts) > 1 and parts[1] == b"/metrics":
+                status, body = "200 OK", render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+# Print a JSON snapshot every `interval` seconds
+async def log_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps({"metrics": snapshot()}, default=str))
+
+
+# Measure how late the loop wakes a task; blocking handlers show up here
+async def watch_loop_lag(interval: float = 0.5):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        loop_lag.observe(max(0.0, time.perf_counter() - start - interval))
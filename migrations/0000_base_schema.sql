@@ -0,0 +1,32 @@
+-- Base schema for the skill tables and the migration log.
+-- Safe to run against an existing project: every statement is idempotent.
+-- Apply migrations in file order; each one records its version in
+-- schema_migrations, which the bot checks at startup (storage.verify_schema).
+
+create table if not exists schema_migrations (
+    version integer primary key,
+    applied_at timestamptz not null default now()
+);
+
+create table if not exists skills (
+    id bigint generated by default as identity primary key,
+    user_id text not null,
+    user_skill_id integer not null,
+    skill_name text not null,
+    base_power integer not null,
+    coin_power integer not null,
+    coins integer not null,
+    unbreakable integer not null default 0
+);
+
+create table if not exists ttrpg_skills (
+    id bigint generated by default as identity primary key,
+    user_id text not null,
+    user_skill_id integer not null,
+    skill_slot integer not null,
+    skill_name text not null,
+    base_power integer not null,
+    dice_power integer not null
+);
+
+insert into schema_migrations (version) values (0) on conflict do nothing;
@@ -0,0 +1,57 @@
+-- Atomic skill ID allocation.
+-- Each function takes a per-user advisory lock, picks max(user_skill_id) + 1
+-- and inserts the row in the same transaction, returning the new ID.
+-- Called from storage.py through supabase.rpc().
+
+create or replace function insert_skill(
+    p_user_id text,
+    p_skill_name text,
+    p_base_power integer,
+    p_coin_power integer,
+    p_coins integer,
+    p_unbreakable integer
+) returns integer
+language plpgsql
+as $$
+declare
+    new_id integer;
+begin
+    perform pg_advisory_xact_lock(hashtext('skills:' || p_user_id));
+
+    select coalesce(max(user_skill_id), 0) + 1 into new_id
+    from skills
+    where user_id = p_user_id;
+
+    insert into skills (user_id, user_skill_id, skill_name, base_power, coin_power, coins, unbreakable)
+    values (p_user_id, new_id, p_skill_name, p_base_power, p_coin_power, p_coins, p_unbreakable);
+
+    return new_id;
+end;
+$$;
+
+create or replace function insert_skill_ttrpg(
+    p_user_id text,
+    p_skill_slot integer,
+    p_skill_name text,
+    p_base_power integer,
+    p_dice_power integer
+) returns integer
+language plpgsql
+as $$
+declare
+    new_id integer;
+begin
+    perform pg_advisory_xact_lock(hashtext('ttrpg_skills:' || p_user_id));
+
+    select coalesce(max(user_skill_id), 0) + 1 into new_id
+    from ttrpg_skills
+    where user_id = p_user_id;
+
+    insert into ttrpg_skills (user_id, user_skill_id, skill_slot, skill_name, base_power, dice_power)
+    values (p_user_id, new_id, p_skill_slot, p_skill_name, p_base_power, p_dice_power);
+
+    return new_id;
+end;
+$$;
+
+insert into schema_migrations (version) values (1) on conflict do nothing;
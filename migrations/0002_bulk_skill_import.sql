@@ -0,0 +1,65 @@
+-- Bulk skill import.
+-- Inserts a JSON array of skills for one user in a single call, numbering
+-- them after the user's current max(user_skill_id) in array order.
+-- Returns the new IDs. Called from storage.insert_skills().
+
+create or replace function insert_skills(
+    p_user_id text,
+    p_skills jsonb
+) returns setof integer
+language plpgsql
+as $$
+declare
+    start_id integer;
+begin
+    perform pg_advisory_xact_lock(hashtext('skills:' || p_user_id));
+
+    select coalesce(max(user_skill_id), 0) into start_id
+    from skills
+    where user_id = p_user_id;
+
+    return query
+    insert into skills (user_id, user_skill_id, skill_name, base_power, coin_power, coins, unbreakable)
+    select
+        p_user_id,
+        start_id + e.ord::integer,
+        e.skill->>'skill_name',
+        (e.skill->>'base_power')::integer,
+        (e.skill->>'coin_power')::integer,
+        (e.skill->>'coins')::integer,
+        (e.skill->>'unbreakable')::integer
+    from jsonb_array_elements(p_skills) with ordinality as e(skill, ord)
+    returning user_skill_id;
+end;
+$$;
+
+create or replace function insert_skills_ttrpg(
+    p_user_id text,
+    p_skills jsonb
+) returns setof integer
+language plpgsql
+as $$
+declare
+    start_id integer;
+begin
+    perform pg_advisory_xact_lock(hashtext('ttrpg_skills:' || p_user_id));
+
+    select coalesce(max(user_skill_id), 0) into start_id
+    from ttrpg_skills
+    where user_id = p_user_id;
+
+    return query
+    insert into ttrpg_skills (user_id, user_skill_id, skill_slot, skill_name, base_power, dice_power)
+    select
+        p_user_id,
+        start_id + e.ord::integer,
+        (e.skill->>'skill_slot')::integer,
+        e.skill->>'skill_name',
+        (e.skill->>'base_power')::integer,
+        (e.skill->>'dice_power')::integer
+    from jsonb_array_elements(p_skills) with ordinality as e(skill, ord)
+    returning user_skill_id;
+end;
+$$;
+
+insert into schema_migrations (version) values (2) on conflict do nothing;
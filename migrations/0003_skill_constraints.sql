@@ -0,0 +1,81 @@
+-- Index-backed lookups and uniqueness for both skill tables.
+-- (user_id, user_skill_id) serves ID lookups, keyset paging and max() in the
+-- insert functions; (user_id, lower(skill_name)) serves name lookups and stops
+-- a user from saving two skills whose names differ only by case.
+
+-- Legacy rows that share (user_id, user_skill_id), left by the old racy plain
+-- inserts, keep the ID on the oldest row; later copies move past the user's
+-- highest ID, in insertion order
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['skills', 'ttrpg_skills'] loop
+        execute format($sql$
+            with ranked as (
+                select id, user_id,
+                       row_number() over (partition by user_id, user_skill_id order by id) as copy
+                from %1$I
+            ), moved as (
+                select r.id,
+                       m.top + row_number() over (partition by r.user_id order by r.id) as new_id
+                from ranked r
+                join (select user_id, max(user_skill_id) as top from %1$I group by user_id) m using (user_id)
+                where r.copy > 1
+            )
+            update %1$I s set user_skill_id = moved.new_id from moved where s.id = moved.id
+        $sql$, t);
+    end loop;
+end $$;
+
+-- Existing duplicate names (ignoring case) keep the lowest ID; later copies get
+-- the first free " (N)" suffix, checked against every name the user has
+do $$
+declare
+    t text;
+    r record;
+    candidate text;
+    n integer;
+    taken boolean;
+begin
+    foreach t in array array['skills', 'ttrpg_skills'] loop
+        for r in execute format($sql$
+            select s.id, s.user_id, s.skill_name from %1$I s
+            where exists (
+                select 1 from %1$I o
+                where o.user_id = s.user_id
+                  and lower(o.skill_name) = lower(s.skill_name)
+                  and o.user_skill_id < s.user_skill_id
+            )
+            order by s.user_id, s.user_skill_id
+        $sql$, t) loop
+            n := 2;
+            loop
+                candidate := r.skill_name || ' (' || n || ')';
+                execute format(
+                    'select exists (select 1 from %I where user_id = $1 and lower(skill_name) = lower($2))', t
+                ) into taken using r.user_id, candidate;
+                exit when not taken;
+                n := n + 1;
+            end loop;
+            execute format('update %I set skill_name = $1 where id = $2', t) using candidate, r.id;
+        end loop;
+    end loop;
+end $$;
+
+create unique index if not exists skills_user_skill_id_key
+    on skills (user_id, user_skill_id);
+create unique index if not exists skills_user_skill_name_key
+    on skills (user_id, lower(skill_name));
+
+create unique index if not exists ttrpg_skills_user_skill_id_key
+    on ttrpg_skills (user_id, user_skill_id);
+create unique index if not exists ttrpg_skills_user_skill_name_key
+    on ttrpg_skills (user_id, lower(skill_name));
+
+-- Sanity checks on new rows; NOT VALID leaves any legacy rows alone
+alter table skills drop constraint if exists skills_coins_check;
+alter table skills add constraint skills_coins_check
+    check (coins >= 0 and unbreakable >= 0 and unbreakable <= coins) not valid;
+
+insert into schema_migrations (version) values (3) on conflict do nothing;
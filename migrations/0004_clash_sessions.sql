@@ -0,0 +1,19 @@
+-- Open clash challenges, so they survive a bot restart.
+-- One small row per challenge: the challenger's skill is stored as a JSON
+-- array so joins after a restart need no skill lookup. Rows are deleted when
+-- the clash resolves, is cancelled or expires (expires_at is a Unix time).
+
+create table if not exists clash_sessions (
+    session_id text primary key,
+    kind text not null,
+    user_id bigint not null,
+    user_name text not null,
+    channel_id bigint not null,
+    message_id bigint,
+    skill jsonb not null,
+    sanity integer not null,
+    live boolean not null default false,
+    expires_at double precision not null
+);
+
+insert into schema_migrations (version) values (4) on conflict do nothing;
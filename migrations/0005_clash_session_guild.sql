@@ -0,0 +1,6 @@
+-- Record which guild a challenge was posted in, so each sharded worker
+-- only restores (and expires) the challenges on its own shards.
+
+alter table clash_sessions add column if not exists guild_id bigint;
+
+insert into schema_migrations (version) values (5) on conflict do nothing;
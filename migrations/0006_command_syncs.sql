@@ -0,0 +1,10 @@
+-- Fingerprint of the last command tree uploaded to Discord, per application
+-- and scope ("global" or "guild:<id>"), so restarts skip unchanged syncs.
+
+create table if not exists command_syncs (
+    scope text primary key,
+    fingerprint text not null,
+    synced_at timestamptz not null default now()
+);
+
+insert into schema_migrations (version) values (6) on conflict do nothing;
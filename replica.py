@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import time
+
+SCHEMA = """
+create table if not exists replica_users (
+    table_name text not null,
+    user_id text not null,
+    synced_at real not null,
+    primary key (table_name, user_id)
+);
+create table if not exists replica_skills (
+    table_name text not null,
+    user_id text not null,
+    user_skill_id integer not null,
+    row text not null,
+    primary key (table_name, user_id, user_skill_id)
+);
+create table if not exists pending_writes (
+    id integer primary key autoincrement,
+    table_name text not null,
+    user_id text not null,
+    op text not null,
+    payload text not null,
+    queued_at real not null
+);
+create index if not exists pending_writes_user on pending_writes (table_name, user_id);
+"""
+
+
+# Local SQLite copy of the skill rows of users the bot has served, plus the
+# writes made while Supabase was unreachable. A user's rows are only trusted
+# once all of them were stored together (replica_users marks that). Queries
+# are tiny and indexed, so they run inline on the event loop.
+class SkillReplica:
+    def __init__(self, path: str):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+
+    # Opened on first use so importing the bot never touches the disk
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("pragma journal_mode = wal")
+            self._db.execute("pragma synchronous = normal")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    # A user's rows in user_skill_id order, or None if they aren't replicated
+    def rows(self, user_id: str, table: str) -> list[dict] | None:
+        known = self.db.execute(
+            "select 1 from replica_users where table_name = ? and user_id = ?", (table, user_id)
+        ).fetchone()
+        if known is None:
+            return None
+        return [json.loads(row) for (row,) in self.db.execute(
+            "select row from replica_skills where table_name = ? and user_id = ? order by user_skill_id",
+            (table, user_id)
+        )]
+
+    # Replace a user's rows with a fresh copy from Supabase. Skipped while the
+    # user has queued writes, which Supabase doesn't have yet.
+    def store(self, user_id: str, table: str, rows: list[dict]):
+        if self.has_pending(user_id, table):
+            return
+        with self.db:
+            self.db.execute("delete from replica_skills where table_name = ? and user_id = ?", (table, user_id))
+            self.db.executemany(
+                "insert into replica_skills values (?, ?, ?, ?)",
+                [(table, user_id, row["user_skill_id"], json.dumps(row)) for row in rows]
+            )
+            self.db.execute(
+                "insert or replace into replica_users values (?, ?, ?)", (table, user_id, time.time())
+            )
+
+    # Write-through helpers; only touch users that are already replicated
+    def add_row(self, user_id: str, table: str, row: dict):
+        with self.db:
+            self.db.execute(
+                "insert or replace into replica_skills select ?, ?, ?, ? "
+                "where exists (select 1 from replica_users where table_name = ? and user_id = ?)",
+                (table, user_id, row["user_skill_id"], json.dumps(row), table, user_id)
+            )
+
+    def remove_row(self, user_id: str, table: str, user_skill_id: int):
+        with self.db:
+            self.db.execute(
+                "delete from replica_skills where table_name = ? and user_id = ? and user_skill_id = ?",
+                (table, user_id, user_skill_id)
+            )
+
+    # Keep the `max_users` most recently synced users; ones with queued writes always stay
+    def prune(self, max_users: int) -> int:
+        with self.db:
+            stale = self.db.execute(
+                "select table_name, user_id from replica_users u "
+                "where not exists (select 1 from pending_writes p "
+                "                  where p.table_name = u.table_name and p.user_id = u.user_id) "
+                "order by synced_at desc limit -1 offset ?",
+                (max_users,)
+            ).fetchall()
+            for table, user_id in stale:
+                self.db.execute("delete from replica_users where table_name = ? and user_id = ?", (table, user_id))
+                self.db.execute("delete from replica_skills where table_name = ? and user_id = ?", (table, user_id))
+        return len(stale)
+
+    def user_count(self) -> int:
+        return self.db.execute("select count(*) from replica_users").fetchone()[0]
+
+    # ----------------------
+    # Write Queue
+    # ----------------------
+
+    def queue(self, user_id: str, table: str, op: str, payload):
+        with self.db:
+            self.db.execute(
+                "insert into pending_writes (table_name, user_id, op, payload, queued_at) values (?, ?, ?, ?, ?)",
+                (table, user_id, op, json.dumps(payload), time.time())
+            )
+
+    # Queued writes oldest first, as (id, user_id, table, op, payload)
+    def pending(self, limit: int = 100) -> list[tuple]:
+        return [
+            (write_id, user_id, table, op, json.loads(payload))
+            for write_id, user_id, table, op, payload in self.db.execute(
+                "select id, user_id, table_name, op, payload from pending_writes order by id limit ?", (limit,)
+            )
+        ]
+
+    def has_pending(self, user_id: str, table: str) -> bool:
+        return self.db.execute(
+            "select 1 from pending_writes where table_name = ? and user_id = ? limit 1", (table, user_id)
+        ).fetchone() is not None
+
+    def pending_count(self) -> int:
+        return self.db.execute("select count(*) from pending_writes").fetchone()[0]
+
+    def done(self, write_id: int):
+        with self.db:
+            self.db.execute("delete from pending_writes where id = ?", (write_id,))
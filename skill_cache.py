@@ -0,0 +1,137 @@
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+
+# All of one user's skills from one table, indexed by ID and by lowercase name
+# (names are unique per user ignoring case, see migrations/0003)
+class UserSkills:
+    def __init__(self, rows, expires_at: float):
+        self.by_id = {}
+        self.by_name = {}
+        self.expires_at = expires_at
+        # Sorted (lowercase name, name) pairs for prefix lookups, built on first use
+        self._name_index = None
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        self.by_id[row["user_skill_id"]] = row
+        # Duplicate names resolve to the lowest ID, like an ordered select
+        key = row["skill_name"].lower()
+        if key not in self.by_name:
+            self.by_name[key] = row
+            if self._name_index is not None:
+                insort(self._name_index, (key, row["skill_name"]))
+
+    def remove(self, row):
+        self.by_id.pop(row["user_skill_id"], None)
+        key = row["skill_name"].lower()
+        current = self.by_name.get(key)
+        if current is not None and current["user_skill_id"] == row["user_skill_id"]:
+            del self.by_name[key]
+            if self._name_index is not None:
+                self._name_index.remove((key, current["skill_name"]))
+            for other in sorted(self.by_id.values(), key=lambda r: r["user_skill_id"]):
+                if other["skill_name"].lower() == key:
+                    self.by_name[key] = other
+                    if self._name_index is not None:
+                        insort(self._name_index, (key, other["skill_name"]))
+                    break
+
+    def find(self, skill_name=None, skill_id=None):
+        if skill_id is not None:
+            return self.by_id.get(skill_id)
+        if skill_name is not None:
+            return self.by_name.get(skill_name.lower())
+        return None
+
+    # Case-insensitive name suggestions: prefix matches first, then substrings
+    def suggest(self, text: str, limit: int = 25) -> list[str]:
+        if self._name_index is None:
+            self._name_index = sorted((key, row["skill_name"]) for key, row in self.by_name.items())
+
+        text = text.lower()
+        names = []
+        i = bisect_left(self._name_index, (text,))
+        while i < len(self._name_index) and len(names) < limit:
+            key, name = self._name_index[i]
+            if not key.startswith(text):
+                break
+            names.append(name)
+            i += 1
+
+        if len(names) < limit and text:
+            for key, name in self._name_index:
+                if text in key and not key.startswith(text):
+                    names.append(name)
+                    if len(names) == limit:
+                        break
+        return names
+
+    def rows(self):
+        return sorted(self.by_id.values(), key=lambda r: r["user_skill_id"])
+
+
+# Bounded LRU + TTL cache keyed by (user_id, table)
+class SkillCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[str, str], UserSkills] = OrderedDict()
+
+    # Whether a (user_id, table) entry is cached and fresh; doesn't count as a lookup
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires_at > time.monotonic()
+
+    def get(self, user_id: str, table: str) -> UserSkills | None:
+        key = (user_id, table)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, user_id: str, table: str, rows) -> UserSkills:
+        entry = UserSkills(rows, time.monotonic() + self.ttl)
+        key = (user_id, table)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    # Write-through helpers; only touch users that are already cached
+    def add_row(self, user_id: str, table: str, row):
+        entry = self._entries.get((user_id, table))
+        if entry is not None:
+            entry.add(row)
+
+    def remove_row(self, user_id: str, table: str, row):
+        entry = self._entries.get((user_id, table))
+        if entry is not None:
+            entry.remove(row)
+
+    def invalidate(self, user_id: str, table: str):
+        self._entries.pop((user_id, table), None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
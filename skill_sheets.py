@@ -0,0 +1,132 @@
+import csv
+import io
+import json
+
+from clash_engine import MAX_COINS, MAX_DICE
+from storage import SKILLS_TABLE, TTRPG_SKILLS_TABLE
+
+MAX_SHEET_BYTES = 256 * 1024
+MAX_SHEET_ROWS = 200
+MAX_SKILL_NAME = 100
+
+# Columns of a skill sheet, in export order
+SHEET_FIELDS = {
+    SKILLS_TABLE: ("skill_name", "base_power", "coin_power", "coins", "unbreakable"),
+    TTRPG_SKILLS_TABLE: ("skill_slot", "skill_name", "base_power", "dice_power"),
+}
+# Columns that may be left out of an imported sheet
+SHEET_DEFAULTS = {"unbreakable": 0}
+
+
+# Raised for an unreadable or invalid sheet; `problems` lists every bad row
+class SheetError(ValueError):
+    def __init__(self, problems: list[str]):
+        super().__init__("\n".join(problems))
+        self.problems = problems
+
+
+# Checked against an attachment's declared size before downloading it
+def check_sheet_size(size: int):
+    if size > MAX_SHEET_BYTES:
+        raise SheetError([f"File is too large (max {MAX_SHEET_BYTES // 1024} KB)."])
+
+
+# Read a CSV or JSON sheet into raw row dicts
+def read_sheet(filename: str, data: bytes) -> list[dict]:
+    check_sheet_size(len(data))
+
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise SheetError(["File must be UTF-8 text."])
+
+    if filename.lower().endswith(".json"):
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise SheetError([f"Invalid JSON: {e.msg} (line {e.lineno})."])
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise SheetError(["JSON sheets must be a list of skill objects."])
+        return rows
+
+    if filename.lower().endswith(".csv"):
+        reader = csv.DictReader(io.StringIO(text))
+        return [{k.strip(): v for k, v in row.items() if k} for row in reader]
+
+    raise SheetError(["Sheets must be .csv or .json files."])
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, int):
+        return value
+    return int(str(value).strip())
+
+
+# Check every row up front so nothing is inserted from a half-valid sheet
+def validate_sheet(rows: list[dict], table: str) -> list[dict]:
+    if not rows:
+        raise SheetError(["The sheet has no skills."])
+    if len(rows) > MAX_SHEET_ROWS:
+        raise SheetError([f"Too many skills (max {MAX_SHEET_ROWS} per import)."])
+
+    problems = []
+    valid = []
+    seen_names = set()
+    for line, row in enumerate(rows, 1):
+        clean = {}
+        for field in SHEET_FIELDS[table]:
+            value = row.get(field)
+            if value is None or value == "":
+                if field not in SHEET_DEFAULTS:
+                    problems.append(f"Row {line}: missing `{field}`.")
+                    continue
+                value = SHEET_DEFAULTS[field]
+
+            if field == "skill_name":
+                value = str(value).strip()
+                if not value or len(value) > MAX_SKILL_NAME:
+                    problems.append(f"Row {line}: `skill_name` must be 1-{MAX_SKILL_NAME} characters.")
+                    continue
+            else:
+                try:
+                    value = _to_int(value)
+                except ValueError:
+                    problems.append(f"Row {line}: `{field}` must be a whole number.")
+                    continue
+            clean[field] = value
+
+        if len(clean) != len(SHEET_FIELDS[table]):
+            continue
+        if clean["skill_name"].lower() in seen_names:
+            problems.append(f"Row {line}: `{clean['skill_name']}` appears more than once.")
+            continue
+        seen_names.add(clean["skill_name"].lower())
+        if table == SKILLS_TABLE and not 0 <= clean["coins"] <= MAX_COINS:
+            problems.append(f"Row {line}: `coins` must be between 0 and {MAX_COINS}.")
+            continue
+        if table == TTRPG_SKILLS_TABLE and abs(clean["dice_power"]) > MAX_DICE:
+            problems.append(f"Row {line}: `dice_power` must be between -{MAX_DICE} and {MAX_DICE}.")
+            continue
+        if table == SKILLS_TABLE and not 0 <= clean["unbreakable"] <= clean["coins"]:
+            problems.append(f"Row {line}: `unbreakable` must be between 0 and `coins`.")
+            continue
+        valid.append(clean)
+
+    if problems:
+        raise SheetError(problems)
+    return valid
+
+
+# Render skill rows as a CSV or JSON sheet that import accepts back
+def write_sheet(rows: list[dict], table: str, fmt: str = "csv") -> bytes:
+    fields = ("user_skill_id",) + SHEET_FIELDS[table]
+    if fmt == "json":
+        return json.dumps([{f: row[f] for f in fields} for row in rows], indent=2).encode()
+
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode()
@@ -0,0 +1,101 @@
+# Startup benchmark: how long `import coinflips` takes in a fresh interpreter,
+# how long warm_up() takes, and how fast the first commands answer with and
+# without it. Runs offline against the in-memory Supabase from loadtest.py;
+# gateway connect time is Discord's and isn't measured.
+#
+#   python startup_bench.py --runs 5 --latency 0.05
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# First commands timed in each child process
+FIRST_COMMANDS = ("flip_skill", "clash_odds", "clash_odds_ttrpg", "skill_list")
+
+
+def measure_import(runs: int) -> list[float]:
+    code = "import time; t = time.perf_counter(); import coinflips; print(time.perf_counter() - t)"
+    return [float(subprocess.check_output([sys.executable, "-c", code], text=True)) for _ in range(runs)]
+
+
+# Child process: import, seed, optionally warm up, then time each first command once
+async def child(warm: bool, latency: float, users: int) -> dict:
+    started = time.perf_counter()
+    import coinflips
+    import loadtest
+    import storage
+    imported = time.perf_counter() - started
+
+    storage._client = loadtest.FakeSupabase(latency)
+    storage.replica = loadtest.SkillReplica(":memory:")
+    await loadtest.seed_users(users)
+    coinflips.WARM_USERS = users
+
+    warm_seconds = None
+    if warm:
+        started = time.perf_counter()
+        await coinflips.warm_up()
+        warm_seconds = time.perf_counter() - started
+
+    kwargs = {
+        "flip_skill": {"sanity": 0, "skill_name": "Skill 1"},
+        "clash_odds": {"sanity": 10, "opponent_base_power": 5, "opponent_coin_power": 4,
+                       "opponent_coins": 3, "skill_name": "Skill 2"},
+        "clash_odds_ttrpg": {"sanity": 10, "opponent_base_power": 3, "opponent_dice_power": 8,
+                             "skill_name": "Skill 3"},
+        "skill_list": {},
+    }
+    # Warm-up picks the users who saved skills most recently: the last ones seeded
+    first = {}
+    for name in FIRST_COMMANDS:
+        interaction = loadtest.FakeInteraction(users, name)
+        started = time.perf_counter()
+        await loadtest.callback(name)(interaction, **kwargs[name])
+        first[name] = time.perf_counter() - started
+    return {"import": imported, "warm_up": warm_seconds, "first": first}
+
+
+def run_child(warm: bool, latency: float, users: int) -> dict:
+    out = subprocess.check_output(
+        [sys.executable, __file__, "--child", "warm" if warm else "cold",
+         "--latency", str(latency), "--users", str(users)],
+        text=True
+    )
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def median_ms(values) -> float:
+    return statistics.median(values) * 1000
+
+
+def main(args):
+    imports = measure_import(args.runs)
+    print(f"import coinflips: median {median_ms(imports):.0f} ms, "
+          f"min {min(imports) * 1000:.0f} ms over {args.runs} runs")
+
+    cold = [run_child(False, args.latency, args.users) for _ in range(args.runs)]
+    warm = [run_child(True, args.latency, args.users) for _ in range(args.runs)]
+
+    print(f"warm_up(): median {median_ms([r['warm_up'] for r in warm]):.0f} ms "
+          f"({args.users} users, {args.latency * 1000:.0f} ms Supabase latency)")
+    print(f"{'first command':<20}{'cold ms':>10}{'warmed ms':>11}")
+    for name in FIRST_COMMANDS:
+        print(f"{name:<20}{median_ms([r['first'][name] for r in cold]):>10.1f}"
+              f"{median_ms([r['first'][name] for r in warm]):>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-response")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Supabase round trip in seconds")
+    parser.add_argument("--users", type=int, default=20, help="users seeded (and warmed)")
+    parser.add_argument("--child", choices=("cold", "warm"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.child == "warm", args.latency, args.users))))
+    else:
+        main(args)
@@ -0,0 +1,625 @@
+import asyncio
+import functools
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+import httpx
+from postgrest.exceptions import APIError
+
+from breaker import CircuitBreaker, backoff
+from config import env_float, env_int, env_str, worker_index
+from metrics import phase, replayed_writes, replica_reads, supabase_errors, supabase_timeouts
+from replica import SkillReplica
+from skill_cache import SkillCache, UserSkills
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+SKILLS_TABLE = "skills"
+TTRPG_SKILLS_TABLE = "ttrpg_skills"
+CLASH_SESSIONS_TABLE = "clash_sessions"
+COMMAND_SYNCS_TABLE = "command_syncs"
+
+# Columns cached per table; every read is served from these rows
+SKILL_COLUMNS = {
+    SKILLS_TABLE: "user_skill_id, skill_name, base_power, coin_power, coins, unbreakable",
+    TTRPG_SKILLS_TABLE: "user_skill_id, skill_slot, skill_name, base_power, dice_power",
+}
+
+# Stored functions that allocate the next user_skill_id and insert atomically
+INSERT_FUNCTIONS = {
+    SKILLS_TABLE: "insert_skill",
+    TTRPG_SKILLS_TABLE: "insert_skill_ttrpg",
+}
+
+# Stored functions that insert a whole skill sheet in one call
+BULK_INSERT_FUNCTIONS = {
+    SKILLS_TABLE: "insert_skills",
+    TTRPG_SKILLS_TABLE: "insert_skills_ttrpg",
+}
+
+# Latest file in migrations/; the bot warns at startup if the database is behind
+SCHEMA_VERSION = 6
+
+# Postgres error codes for the constraints in migrations/0003_skill_constraints.sql
+UNIQUE_VIOLATION = "23505"
+CHECK_VIOLATION = "23514"
+REJECTED_TEXT = {
+    UNIQUE_VIOLATION: "You already have a skill with that name.",
+    CHECK_VIOLATION: "Unbreakable coins must be between 0 and the total number of coins.",
+}
+
+# Skills shown per /skill_list page
+SKILL_PAGE_SIZE = 10
+
+# Upper bound on in-flight PostgREST requests. The HTTP pool itself keeps
+# httpx's default limits, which are higher, so this semaphore is the cap
+MAX_DB_CONCURRENCY = env_int("SUPABASE_MAX_CONCURRENCY", 10, minimum=1)
+# Per-request timeout, so one slow round trip can't eat a command's whole deadline
+SUPABASE_TIMEOUT = env_float("SUPABASE_TIMEOUT", 5.0, minimum=0.1)
+# Reads are retried after an outage error, with jittered exponential backoff
+READ_RETRIES = env_int("SUPABASE_READ_RETRIES", 2, minimum=0)
+RETRY_BASE_DELAY = env_float("SUPABASE_RETRY_DELAY", 0.1, minimum=0)
+RETRY_MAX_DELAY = 1.0
+# A skill read still waiting on Supabase after this long is answered from the replica
+HEDGE_AFTER = env_float("HEDGE_AFTER", 0.3, minimum=0)
+
+# Local replica of active users' skills; on an ephemeral disk (Heroku) it and
+# its queued writes last as long as the dyno. One file per worker, so workers
+# sharing a host never replay or prune each other's queue.
+REPLICA_PATH = env_str("REPLICA_PATH", f"replica-{worker_index()}.sqlite3")
+REPLICA_MAX_USERS = env_int("REPLICA_MAX_USERS", 20000, minimum=1)
+
+_client: "AsyncClient | None" = None
+_client_lock = asyncio.Lock()
+_db_slots = asyncio.Semaphore(MAX_DB_CONCURRENCY)
+# In-flight skill loads by (user_id, table)
+_loading: dict[tuple[str, str], asyncio.Future] = {}
+# Finished writes per (user_id, table); a load that saw this change while it
+# was in flight holds a snapshot that may predate the write
+_write_counts: dict[tuple[str, str], int] = {}
+
+skill_cache = SkillCache(
+    max_entries=env_int("SKILL_CACHE_SIZE", 1024, minimum=1),
+    ttl=env_float("SKILL_CACHE_TTL", 600.0, minimum=0)
+)
+replica = SkillReplica(REPLICA_PATH)
+
+# Opens on a high share of failed or slow Supabase calls (see breaker.py)
+breaker = CircuitBreaker(
+    window=env_int("BREAKER_WINDOW", 20, minimum=1),
+    min_calls=env_int("BREAKER_MIN_CALLS", 10, minimum=1),
+    error_rate=env_float("BREAKER_ERROR_RATE", 0.5, minimum=0),
+    slow_call=env_float("BREAKER_SLOW_CALL", 2.0, minimum=0),
+    slow_rate=env_float("BREAKER_SLOW_RATE", 0.5, minimum=0),
+    cooldown=env_float("BREAKER_COOLDOWN", 30.0, minimum=0)
+)
+
+UNAVAILABLE_TEXT = "Skill storage is unreachable right now. Please try again in a minute."
+
+# Raised when the database refuses a skill; the message is safe to show users
+class SkillRejected(ValueError):
+    pass
+
+# Raised when Supabase is down (or the breaker is open) and there is no local
+# copy to fall back on; the message is safe to show users
+class SupabaseUnavailable(RuntimeError):
+    pass
+
+# ----------------------
+# Client
+# ----------------------
+
+# Create the async Supabase client on first use and share its pooled HTTP
+# session; the supabase package itself is only imported then
+async def get_client() -> "AsyncClient":
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                from supabase import acreate_client
+                _client = await acreate_client(env_str("SUPABASE_URL"), env_str("SUPABASE_KEY"))
+    return _client
+
+# PostgREST couldn't reach Postgres (PGRST000-003), or a proxy answered with a
+# non-JSON 5xx (postgrest puts the HTTP status in `code`); any other error
+# means the database itself answered
+def _is_outage(e: APIError) -> bool:
+    return str(e.code).startswith("PGRST00") or (isinstance(e.code, int) and e.code >= 500)
+
+# Run a built query without blocking the event loop; every Supabase call goes
+# through here, so this is where round trips, errors and timeouts are counted
+# and fed to the circuit breaker. Outages surface as SupabaseUnavailable.
+async def execute(query):
+    if not breaker.allow():
+        raise SupabaseUnavailable(UNAVAILABLE_TEXT)
+
+    with phase("supabase"):
+        async with _db_slots:
+            started = time.perf_counter()
+            failed = False
+            try:
+                return await asyncio.wait_for(query.execute(), SUPABASE_TIMEOUT)
+            except APIError as e:
+                supabase_errors.inc(e.code or "unknown")
+                if not _is_outage(e):
+                    raise
+                failed = True
+                raise SupabaseUnavailable(UNAVAILABLE_TEXT) from e
+            except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+                supabase_timeouts.inc()
+                failed = True
+                raise SupabaseUnavailable(UNAVAILABLE_TEXT) from e
+            except httpx.TransportError as e:
+                failed = True
+                raise SupabaseUnavailable(UNAVAILABLE_TEXT) from e
+            except asyncio.CancelledError:
+                failed = None
+                breaker.release()
+                raise
+            finally:
+                if failed is not None:
+                    breaker.record(failed, time.perf_counter() - started)
+
+# execute() for reads, retried with backoff while the breaker still allows calls
+async def execute_read(query):
+    for attempt in range(READ_RETRIES + 1):
+        try:
+            return await execute(query)
+        except SupabaseUnavailable:
+            if attempt == READ_RETRIES or not breaker.available():
+                raise
+        await asyncio.sleep(backoff(attempt, RETRY_BASE_DELAY, RETRY_MAX_DELAY))
+
+# Check the database has every migration this bot expects
+async def verify_schema() -> tuple[bool, str]:
+    client = await get_client()
+    try:
+        res = await execute(
+            client.table("schema_migrations").select("version").order("version", desc=True).limit(1)
+        )
+    except APIError as e:
+        return False, f"could not read schema_migrations ({e.message}); apply migrations/ in order"
+
+    version = res.data[0]["version"] if res.data else -1
+    if version < SCHEMA_VERSION:
+        return False, f"database schema is at version {version}, expected {SCHEMA_VERSION}; apply the newer files in migrations/"
+    return True, f"database schema is at version {version}"
+
+# Turn constraint violations from a save into SkillRejected
+def _rejected(e: APIError) -> SkillRejected | None:
+    if e.code in REJECTED_TEXT:
+        return SkillRejected(REJECTED_TEXT[e.code])
+    return None
+
+# A user's skills from the local replica, or None if they aren't replicated.
+# Not cached: the replica is only read while Supabase is down or slow.
+def _replica_skills(user_id: str, table: str, reason: str) -> UserSkills | None:
+    rows = replica.rows(user_id, table)
+    if rows is None:
+        return None
+    replica_reads.inc(reason)
+    return UserSkills(rows, expires_at=0.0)
+
+async def _fetch_user_skills(user_id: str, table: str) -> UserSkills:
+    writes = _write_counts.get((user_id, table), 0)
+    client = await get_client()
+    res = await execute_read(
+        client.table(table)
+        .select(SKILL_COLUMNS[table])
+        .eq("user_id", user_id)
+        .order("user_skill_id")
+    )
+    # Written to meanwhile: the write-through update skipped this uncached
+    # user, so storing the snapshot would bring back the old rows
+    if _write_counts.get((user_id, table), 0) != writes:
+        skill_cache.invalidate(user_id, table)
+        return UserSkills(res.data, expires_at=0.0)
+    replica.store(user_id, table, res.data)
+    return skill_cache.put(user_id, table, res.data)
+
+# One shared load per (user, table): concurrent misses (autocomplete keystrokes)
+# wait on the same query, and callers that give up (timeouts) leave it running
+# so it still fills the cache
+def _start_fetch(user_id: str, table: str) -> asyncio.Future:
+    key = (user_id, table)
+    fetch = _loading.get(key)
+    if fetch is None:
+        fetch = _loading[key] = asyncio.ensure_future(_fetch_user_skills(user_id, table))
+        fetch.add_done_callback(lambda task: _loading.get(key) is task and _loading.pop(key))
+        # Nobody may be left awaiting it; mark the error retrieved
+        fetch.add_done_callback(lambda task: task.cancelled() or task.exception())
+    return fetch
+
+# Load every skill a user has in a table, going to Supabase only on a cache miss.
+# Served from the replica instead while the breaker is open, while the user has
+# writes waiting to be replayed, if Supabase fails, or (a hedged read) if it
+# hasn't answered within HEDGE_AFTER; a hedged fetch still finishes and refreshes
+# the cache and replica in the background.
+async def load_user_skills(user_id: str, table: str):
+    entry = skill_cache.get(user_id, table)
+    if entry is not None:
+        return entry
+
+    if not breaker.available():
+        local = _replica_skills(user_id, table, "breaker_open")
+        if local is None:
+            raise SupabaseUnavailable(UNAVAILABLE_TEXT)
+        return local
+    if replica.has_pending(user_id, table):
+        return _replica_skills(user_id, table, "pending_writes")
+
+    fetch = _start_fetch(user_id, table)
+    local = replica.rows(user_id, table)
+    if local is None:
+        return await asyncio.shield(fetch)
+    try:
+        return await asyncio.wait_for(asyncio.shield(fetch), HEDGE_AFTER)
+    except asyncio.TimeoutError:
+        replica_reads.inc("hedged")
+    except SupabaseUnavailable:
+        replica_reads.inc("outage")
+    return UserSkills(local, expires_at=0.0)
+
+# Marks a write to (table, user_id) as finished, even a failed one since a
+# timed-out write may still have landed. Loads already in flight won't cache
+# their snapshot, and later loads start afresh instead of joining them.
+def _counts_write(func):
+    @functools.wraps(func)
+    async def wrapper(table: str, user_id: str, *args, **kwargs):
+        try:
+            return await func(table, user_id, *args, **kwargs)
+        finally:
+            key = (user_id, table)
+            _write_counts[key] = _write_counts.get(key, 0) + 1
+            _loading.pop(key, None)
+    return wrapper
+
+# Insert a skill and allocate its user_skill_id in one server-side call
+# (see migrations/0001_atomic_skill_ids.sql)
+@_counts_write
+async def insert_skill(table: str, user_id: str, fields: dict) -> int:
+    # Stay behind queued writes so IDs and names agree with what reads show
+    if replica.has_pending(user_id, table):
+        return (await _queue_insert(table, user_id, [fields]))[0]
+
+    client = await get_client()
+    try:
+        res = await execute(client.rpc(
+            INSERT_FUNCTIONS[table],
+            {"p_user_id": user_id, **{f"p_{key}": value for key, value in fields.items()}}
+        ))
+    except APIError as e:
+        raise _rejected(e) or e
+    except SupabaseUnavailable:
+        return (await _queue_insert(table, user_id, [fields]))[0]
+
+    user_skill_id = res.data
+    row = {"user_skill_id": user_skill_id, **fields}
+    skill_cache.add_row(user_id, table, row)
+    replica.add_row(user_id, table, row)
+    return user_skill_id
+
+# Cache the skills of up to `limit` users who most recently saved one, in two
+# round trips (used to warm up after startup). Returns how many were cached.
+async def warm_skill_cache(table: str, limit: int) -> int:
+    client = await get_client()
+    recent = await execute(client.table(table).select("user_id").order("id", desc=True).limit(limit * 20))
+    user_ids = [u for u in dict.fromkeys(r["user_id"] for r in recent.data) if (u, table) not in skill_cache]
+    user_ids = user_ids[:limit]
+    if not user_ids:
+        return 0
+    writes = {user_id: _write_counts.get((user_id, table), 0) for user_id in user_ids}
+
+    res = await execute(
+        client.table(table)
+        .select("user_id, " + SKILL_COLUMNS[table])
+        .in_("user_id", user_ids)
+        .order("user_skill_id")
+    )
+    rows = {user_id: [] for user_id in user_ids}
+    for row in res.data:
+        rows[row.pop("user_id")].append(row)
+    rows = {u: r for u, r in rows.items() if _write_counts.get((u, table), 0) == writes[u]}
+    for user_id, user_rows in rows.items():
+        skill_cache.put(user_id, table, user_rows)
+        replica.store(user_id, table, user_rows)
+    return len(rows)
+
+# Skill name suggestions for autocomplete, served from the cached name index
+async def suggest_skill_names(user_id: str, table: str, text: str, limit: int = 25) -> list[str]:
+    skills = await load_user_skills(user_id, table)
+    return skills.suggest(text, limit)
+
+# One page of a user's skills by keyset on user_skill_id (for /skill_list).
+# Walks forward from after_id, or backward from before_id; returns the page in
+# ID order plus whether more rows lie further in the direction of travel.
+async def list_skills_page(table: str, user_id: str, after_id: int = 0,
+                           before_id: int | None = None, page_size: int = SKILL_PAGE_SIZE):
+    backward = before_id is not None
+
+    cached = skill_cache.get(user_id, table)
+    if cached is None and (not breaker.available() or replica.has_pending(user_id, table)):
+        cached = _replica_skills(user_id, table, "breaker_open")
+    if cached is None:
+        client = await get_client()
+        query = client.table(table).select(SKILL_COLUMNS[table]).eq("user_id", user_id)
+        if backward:
+            query = query.lt("user_skill_id", before_id).order("user_skill_id", desc=True)
+        else:
+            query = query.gt("user_skill_id", after_id).order("user_skill_id")
+        try:
+            rows = (await execute_read(query.limit(page_size + 1))).data
+        except SupabaseUnavailable:
+            cached = _replica_skills(user_id, table, "outage")
+            if cached is None:
+                raise
+    if cached is not None:
+        rows = cached.rows()
+        if backward:
+            rows = [r for r in rows if r["user_skill_id"] < before_id][-(page_size + 1):][::-1]
+        else:
+            rows = [r for r in rows if r["user_skill_id"] > after_id][:page_size + 1]
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backward:
+        rows.reverse()
+    return rows, has_more
+
+# Insert many skills in one server-side call (see migrations/0002_bulk_skill_import.sql)
+@_counts_write
+async def insert_skills(table: str, user_id: str, rows: list[dict]) -> list[int]:
+    if not rows:
+        return []
+    if replica.has_pending(user_id, table):
+        return await _queue_insert(table, user_id, rows)
+
+    client = await get_client()
+    try:
+        res = await execute(client.rpc(
+            BULK_INSERT_FUNCTIONS[table],
+            {"p_user_id": user_id, "p_skills": rows}
+        ))
+    except APIError as e:
+        raise _rejected(e) or e
+    except SupabaseUnavailable:
+        return await _queue_insert(table, user_id, rows)
+
+    # IDs are handed out in sheet order
+    skill_ids = sorted(res.data)
+    for user_skill_id, row in zip(skill_ids, rows):
+        skill_cache.add_row(user_id, table, {"user_skill_id": user_skill_id, **row})
+        replica.add_row(user_id, table, {"user_skill_id": user_skill_id, **row})
+    return skill_ids
+
+# Delete by ID or name in one round trip, returning only the removed rows' keys
+@_counts_write
+async def delete_skill_rows(table: str, user_id: str, skill_name=None, skill_id=None):
+    if skill_id is None and skill_name is None:
+        return []
+    if replica.has_pending(user_id, table):
+        return _queue_delete(table, user_id, skill_name, skill_id)
+
+    client = await get_client()
+    query = client.table(table).delete().eq("user_id", user_id)
+
+    if skill_id is not None:
+        query = query.eq("user_skill_id", skill_id)
+    else:
+        # Names are unique ignoring case, but PostgREST reads `*` in an ILIKE
+        # pattern as a wildcard that can't be escaped. Resolve the name to its
+        # row instead (usually from the cache) and delete that exact row.
+        row = (await load_user_skills(user_id, table)).find(skill_name=skill_name)
+        if row is None:
+            return []
+        query = query.eq("user_skill_id", row["user_skill_id"]).eq("skill_name", row["skill_name"])
+
+    try:
+        res = await execute(query.select("user_skill_id", "skill_name"))
+    except SupabaseUnavailable:
+        return _queue_delete(table, user_id, skill_name, skill_id)
+
+    for row in res.data:
+        skill_cache.remove_row(user_id, table, row)
+        replica.remove_row(user_id, table, row["user_skill_id"])
+    return sorted(res.data, key=lambda r: r["user_skill_id"])
+
+# ----------------------
+# Offline Writes
+# ----------------------
+
+# Save skills to the replica while Supabase is down, or while the user has
+# earlier writes still queued, and queue them for replay.
+# Only possible for replicated users, since names are checked and IDs handed
+# out (max + 1, like the insert functions) against their local rows.
+async def _queue_insert(table: str, user_id: str, rows: list[dict]) -> list[int]:
+    local = replica.rows(user_id, table)
+    if local is None:
+        raise SupabaseUnavailable(UNAVAILABLE_TEXT)
+
+    names = {r["skill_name"].lower() for r in local}
+    for row in rows:
+        if row["skill_name"].lower() in names:
+            raise SkillRejected(REJECTED_TEXT[UNIQUE_VIOLATION])
+        if table == SKILLS_TABLE and not 0 <= row["unbreakable"] <= row["coins"]:
+            raise SkillRejected(REJECTED_TEXT[CHECK_VIOLATION])
+        names.add(row["skill_name"].lower())
+
+    next_id = max((r["user_skill_id"] for r in local), default=0) + 1
+    skill_ids = list(range(next_id, next_id + len(rows)))
+    for user_skill_id, row in zip(skill_ids, rows):
+        skill_cache.add_row(user_id, table, {"user_skill_id": user_skill_id, **row})
+        replica.add_row(user_id, table, {"user_skill_id": user_skill_id, **row})
+    replica.queue(user_id, table, "insert", rows)
+    return skill_ids
+
+# Delete from the replica (same conditions as _queue_insert) and queue the delete by name
+# (names are unique per user, and IDs given out offline may change on replay)
+def _queue_delete(table: str, user_id: str, skill_name=None, skill_id=None) -> list[dict]:
+    local = replica.rows(user_id, table)
+    if local is None:
+        raise SupabaseUnavailable(UNAVAILABLE_TEXT)
+
+    deleted = [
+        {"user_skill_id": r["user_skill_id"], "skill_name": r["skill_name"]}
+        for r in local
+        if (r["user_skill_id"] == skill_id if skill_id is not None
+            else r["skill_name"].lower() == skill_name.lower())
+    ]
+    for row in deleted:
+        skill_cache.remove_row(user_id, table, row)
+        replica.remove_row(user_id, table, row["user_skill_id"])
+    if deleted:
+        replica.queue(user_id, table, "delete", [row["skill_name"] for row in deleted])
+    return deleted
+
+# Send queued writes to Supabase in order. Stops at the first outage; a write
+# the database refuses (e.g. a name taken from another worker) is dropped.
+# Each user whose writes were replayed is reloaded, which also settles any IDs
+# that changed. Returns how many writes were replayed or dropped.
+async def replay_pending_writes() -> int:
+    if not breaker.available():
+        return 0
+
+    client = await get_client()
+    replayed = 0
+    touched = set()
+    for write_id, user_id, table, op, payload in replica.pending():
+        if op == "insert":
+            query = client.rpc(BULK_INSERT_FUNCTIONS[table], {"p_user_id": user_id, "p_skills": payload})
+        else:
+            query = client.table(table).delete().eq("user_id", user_id).in_("skill_name", payload)
+        try:
+            await execute(query)
+            replayed_writes.inc("ok")
+        except SupabaseUnavailable:
+            break
+        except APIError as e:
+            replayed_writes.inc("rejected")
+            print(f"WARNING: dropped a queued {op} of {table} for user {user_id} ({e.message})")
+        replica.done(write_id)
+        touched.add((user_id, table))
+        replayed += 1
+
+    for user_id, table in touched:
+        if not replica.has_pending(user_id, table):
+            skill_cache.invalidate(user_id, table)
+            try:
+                await _fetch_user_skills(user_id, table)
+            except SupabaseUnavailable:
+                pass
+    return replayed
+
+# ----------------------
+# Limbus Skill Storage
+# ----------------------
+
+# Save Skill Function
+async def save_skill(user_id, skill_name, base_power, coin_power, coins, unbreakable):
+    return await insert_skill(SKILLS_TABLE, user_id, {
+        "skill_name": skill_name,
+        "base_power": base_power,
+        "coin_power": coin_power,
+        "coins": coins,
+        "unbreakable": unbreakable
+    })
+
+# Load skill function (for /flip)
+async def load_skill(user_id, skill_name=None, skill_id=None):
+    if skill_id is None and skill_name is None:
+        return None
+
+    skills = await load_user_skills(user_id, SKILLS_TABLE)
+    row = skills.find(skill_name, skill_id)
+
+    if row is None:
+        return None
+
+    return (
+        row["skill_name"],
+        row["base_power"],
+        row["coin_power"],
+        row["coins"],
+        row["unbreakable"]
+    )
+
+# Load several skills at once (for /flip_many); refs are names or IDs, None means all
+async def load_skills(user_id, skill_refs=None):
+    skills = await load_user_skills(user_id, SKILLS_TABLE)
+    if skill_refs is None:
+        return [(row["user_skill_id"], row) for row in skills.rows()]
+    return [
+        (ref, skills.find(skill_id=ref) if isinstance(ref, int) else skills.find(skill_name=ref))
+        for ref in skill_refs
+    ]
+
+# Delete skill function
+async def delete_skill(user_id, skill_name=None, skill_id=None):
+    deleted = await delete_skill_rows(SKILLS_TABLE, user_id, skill_name, skill_id)
+    return deleted[0]["skill_name"] if deleted else None
+
+# ----------------------
+# TTRPG Skill Storage
+# ----------------------
+
+# Save Skill TTRPG Function
+async def save_skill_ttrpg(user_id: str, skill_slot: int, skill_name: str, base_power: int, dice_power: int):
+    return await insert_skill(TTRPG_SKILLS_TABLE, user_id, {
+        "skill_slot": skill_slot,
+        "skill_name": skill_name,
+        "base_power": base_power,
+        "dice_power": dice_power
+    })
+
+# Load Skill TTRPG Function (for /flip_ttrpg)
+async def load_skill_ttrpg(user_id: str, skill_name: str = None, skill_id: int = None):
+    if skill_id is None and skill_name is None:
+        return None
+
+    skills = await load_user_skills(user_id, TTRPG_SKILLS_TABLE)
+    row = skills.find(skill_name, skill_id)
+    if row:
+        return row["skill_slot"], row["skill_name"], row["base_power"], row["dice_power"]
+    return None
+
+# Delete Skill TTRPG Function
+async def delete_skill_ttrpg(user_id: str, skill_name: str = None, skill_id: int = None):
+    deleted = await delete_skill_rows(TTRPG_SKILLS_TABLE, user_id, skill_name, skill_id)
+    return deleted[0]["skill_name"] if deleted else None
+
+# ----------------------
+# Clash Session Storage
+# ----------------------
+
+# Persist an open challenge (see migrations/0004_clash_sessions.sql)
+async def save_clash_session(row: dict):
+    client = await get_client()
+    await execute(client.table(CLASH_SESSIONS_TABLE).upsert(row))
+
+async def delete_clash_session(session_id: str):
+    client = await get_client()
+    await execute(client.table(CLASH_SESSIONS_TABLE).delete().eq("session_id", session_id))
+
+# Every persisted challenge, expired or not
+async def load_clash_sessions() -> list[dict]:
+    client = await get_client()
+    res = await execute(client.table(CLASH_SESSIONS_TABLE).select("*"))
+    return res.data
+
+# ----------------------
+# Command Sync Storage
+# ----------------------
+
+# Fingerprint of the command tree last synced for a scope (see migrations/0006_command_syncs.sql)
+async def load_command_fingerprint(scope: str) -> str | None:
+    client = await get_client()
+    res = await execute(client.table(COMMAND_SYNCS_TABLE).select("fingerprint").eq("scope", scope).limit(1))
+    return res.data[0]["fingerprint"] if res.data else None
+
+async def save_command_fingerprint(scope: str, fingerprint: str):
+    client = await get_client()
+    await execute(client.table(COMMAND_SYNCS_TABLE).upsert({
+        "scope": scope, "fingerprint": fingerprint, "synced_at": datetime.now(timezone.utc).isoformat()
+    }))
@@ -0,0 +1,25 @@
+import os
+import sys
+
+# The bot's modules live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+# storage.py against an empty in-memory Supabase, replica and cache
+@pytest.fixture
+def db(monkeypatch):
+    import loadtest
+    import storage
+    from breaker import CircuitBreaker
+    from replica import SkillReplica
+    from skill_cache import SkillCache
+
+    fake = loadtest.FakeSupabase()
+    monkeypatch.setattr(storage, "_client", fake)
+    monkeypatch.setattr(storage, "replica", SkillReplica(":memory:"))
+    monkeypatch.setattr(storage, "skill_cache", SkillCache())
+    monkeypatch.setattr(storage, "breaker", CircuitBreaker())
+    monkeypatch.setattr(storage, "_loading", {})
+    return fake
@@ -0,0 +1,40 @@
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_trips_on_error_rate_once_enough_calls():
+    breaker = CircuitBreaker(window=10, min_calls=4, error_rate=0.5, cooldown=60)
+    for failed in (True, True, True):
+        assert breaker.allow()
+        breaker.record(failed, 0.01)
+    assert breaker.state == CLOSED
+
+    breaker.record(False, 0.01)
+    assert breaker.state == OPEN and breaker.trips == 1
+    assert not breaker.allow() and not breaker.available()
+
+
+def test_trips_on_slow_calls():
+    breaker = CircuitBreaker(min_calls=2, slow_call=1.0, slow_rate=0.5)
+    breaker.record(False, 0.1)
+    breaker.record(False, 1.5)
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(min_calls=1, cooldown=0)
+    breaker.record(True, 0.01)
+    assert breaker.state == OPEN
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow() and not breaker.available()
+
+    # A cancelled probe frees the slot; a failed one re-opens
+    breaker.release()
+    assert breaker.allow()
+    breaker.record(True, 0.01)
+    assert breaker.state == OPEN and breaker.trips == 2
+
+    assert breaker.allow()
+    breaker.record(False, 0.01)
+    assert breaker.state == CLOSED and not breaker.calls
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from clash_engine import (
+    MAX_CLASH_STEPS, MAX_SANITY, MIN_SANITY, SkillSpec, apply_sanity_mod, run_clash, run_clash_ttrpg
+)
+from clash_odds import apply_sanity_mod_array, exact_clash_odds, exact_ttrpg_odds, simulate_clash_odds
+
+SKILL1 = SkillSpec(base_power=5, coin_power=3, coins=4, unbreakable=1)
+SKILL2 = SkillSpec(base_power=6, coin_power=2, coins=5)
+
+
+# The DP, the NumPy simulation and the turn-by-turn engine must agree on who wins
+def test_solvers_agree_on_win_rate():
+    exact = exact_clash_odds(SKILL1, 10, SKILL2, 0).win_probability
+    assert exact == pytest.approx(0.6028, abs=0.001)
+
+    simulated = simulate_clash_odds(SKILL1, 10, SKILL2, 0, trials=200_000, seed=1, budget=None)
+    assert simulated.trials == 200_000
+    assert simulated.win_probability == pytest.approx(exact, abs=0.005)
+
+    rng = random.Random(1)
+    trials = 20_000
+    wins = sum(run_clash(SKILL1, 10, SKILL2, 0, rng=rng).winner == 1 for _ in range(trials))
+    assert wins / trials == pytest.approx(exact, abs=0.015)
+
+
+# Equal skills with no coin power tie every step: nobody wins, not player 1
+def test_tie_only_clash_is_a_stalemate():
+    stuck = SkillSpec(base_power=4, coin_power=0, coins=3, unbreakable=1)
+    result = run_clash(stuck, 0, stuck, 20, rng=random.Random(1))
+    assert result.winner is None and result.winner_flip is None and result.loser_flip is None
+    assert len(result.steps) == MAX_CLASH_STEPS
+
+    for odds in (exact_clash_odds(stuck, 0, stuck, 20),
+                 simulate_clash_odds(stuck, 0, stuck, 20, trials=2000, seed=1, budget=None)):
+        assert odds.win_probability == 0.0
+        assert odds.draw_probability == 1.0
+        assert odds.power_distribution == {}
+
+    empty = SkillSpec(base_power=4, coin_power=1, coins=0)
+    assert run_clash(empty, 0, empty, 0).winner is None
+    assert exact_clash_odds(empty, 0, empty, 0).draw_probability == 1.0
+
+    assert exact_clash_odds(SKILL1, 10, SKILL2, 0).draw_probability == 0.0
+
+
+def test_tie_only_ttrpg_clash_is_a_stalemate():
+    result = run_clash_ttrpg(5, 1, 0, 5, 1, 0, rng=random.Random(1))
+    assert result.winner is None and result.damage == 0
+    odds = exact_ttrpg_odds(5, 1, 0, 5, 1, 0)
+    assert odds.win_probability == odds.opponent_win_probability == 0.0
+    assert odds.damage_distribution == {}
+
+
+# The if/elif ladder apply_sanity_mod used before it became a lookup table
+def bracket_sanity_mod(sanity: int, base_power: int, dice_power: int) -> tuple[int, int]:
+    sign = 1 if dice_power >= 0 else -1
+    mod_base = base_power
+    mod_dice = abs(dice_power)
+    if -45 <= sanity <= -41:
+        mod_base -= 3 * sign
+        mod_dice += 2 * sign
+    elif -40 <= sanity <= -21:
+        mod_base -= 2 * sign
+        mod_dice += 2 * sign
+    elif -20 <= sanity <= -1:
+        mod_base -= 1 * sign
+        mod_dice += 1 * sign
+    elif 1 <= sanity <= 20:
+        mod_base += 1 * sign
+        mod_dice -= 1 * sign
+    elif 21 <= sanity <= 40:
+        mod_base += 2 * sign
+        mod_dice -= 2 * sign
+    elif 41 <= sanity <= 45:
+        mod_base += 3 * sign
+        mod_dice -= 2 * sign
+    return mod_base, max(1, mod_dice)
+
+
+def test_sanity_table_matches_brackets():
+    cases = [(sanity, dice_power) for sanity in range(MIN_SANITY - 5, MAX_SANITY + 6)
+             for dice_power in (-6, -2, -1, 0, 1, 2, 6)]
+    for sanity, dice_power in cases:
+        assert apply_sanity_mod(sanity, 4, dice_power) == bracket_sanity_mod(sanity, 4, dice_power), \
+            (sanity, dice_power)
+
+    sanities, dice_powers = zip(*cases)
+    mod_base, mod_dice = apply_sanity_mod_array(sanities, 4, dice_powers)
+    assert list(zip(mod_base.tolist(), mod_dice.tolist())) == [bracket_sanity_mod(s, 4, d) for s, d in cases]
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from clash_sessions import LIMBUS, ClashSession, SessionLimitError, SessionRegistry
+
+SKILL = ("Slash", 3, 2, 3, 0)
+
+
+def test_limits_per_user_channel_and_total():
+    registry = SessionRegistry(per_user=2, per_channel=3, total=4)
+    registry.open(LIMBUS, 1, "A", 10, SKILL, 0)
+    registry.open(LIMBUS, 1, "A", 10, SKILL, 0)
+    with pytest.raises(SessionLimitError):
+        registry.open(LIMBUS, 1, "A", 11, SKILL, 0)
+
+    registry.open(LIMBUS, 2, "B", 10, SKILL, 0)
+    with pytest.raises(SessionLimitError):
+        registry.open(LIMBUS, 3, "C", 10, SKILL, 0)
+
+    registry.open(LIMBUS, 3, "C", 11, SKILL, 0)
+    with pytest.raises(SessionLimitError):
+        registry.open(LIMBUS, 4, "D", 12, SKILL, 0)
+    assert len(registry) == 4 and registry.opened == 4
+
+
+def test_claim_is_first_come_and_frees_the_slot():
+    registry = SessionRegistry(per_user=1)
+    session = registry.open(LIMBUS, 1, "A", 10, SKILL, 0)
+    registry.attach_message(session, 99)
+    assert registry.get_by_message(99) is session
+
+    assert registry.claim(session.session_id) is session
+    assert registry.claim(session.session_id) is None
+    assert registry.get_by_message(99) is None
+    assert registry.for_user(1) == [] and registry.count_channel(10) == 0
+    registry.open(LIMBUS, 1, "A", 10, SKILL, 0)
+
+
+def test_expired_sessions_are_reclaimed():
+    registry = SessionRegistry(per_user=1)
+    session = registry.open(LIMBUS, 1, "A", 10, SKILL, 0, timeout=30)
+    assert registry.expire(now=time.time() + 60) == [session]
+    assert registry.get(session.session_id) is None and registry.expired == 1
+
+    session.expires_at = time.time() - 1
+    assert not registry.restore(session)
+
+
+def test_rows_round_trip_and_restore_skips_limits():
+    registry = SessionRegistry(per_user=1)
+    session = registry.open(LIMBUS, 1, "A", 10, SKILL, 5, guild_id=7)
+    registry.attach_message(session, 99)
+    copy = ClashSession.from_row(session.to_row())
+    assert copy == session and copy.skill == SKILL
+
+    other = SessionRegistry(per_user=1, total=1)
+    other.open(LIMBUS, 1, "A", 10, SKILL, 0)
+    assert other.restore(copy) and not other.restore(copy)
+    assert other.get_by_message(99) == session
@@ -0,0 +1,60 @@
+import random
+from types import SimpleNamespace
+
+from clash_engine import SkillSpec, flip_coins
+from clash_sessions import LIMBUS, ClashSession
+from coinflips import CLASH_PAGE_LIMIT, paginate, parse_skill_refs, render_clash
+
+# Discord's message cap
+MESSAGE_LIMIT = 2000
+
+
+def test_paginate_packs_blocks_in_order():
+    blocks = [f"block {i}" for i in range(10)]
+    assert paginate(blocks, limit=30) == [
+        "block 0\n\nblock 1\n\nblock 2", "block 3\n\nblock 4\n\nblock 5",
+        "block 6\n\nblock 7\n\nblock 8", "block 9",
+    ]
+
+
+def test_paginate_splits_oversized_blocks():
+    block = "\n".join("x" * 30 for _ in range(10)) + "\n" + "y" * 120
+    pages = paginate(["head", block], limit=100)
+    assert all(len(page) <= 100 for page in pages)
+    assert "".join(pages).replace("\n", "") == "head" + "x" * 300 + "y" * 120
+
+
+def test_max_coin_messages_fit():
+    skill = SkillSpec(base_power=1, coin_power=1, coins=50, unbreakable=50)
+    flip = flip_coins(skill, skill.normal_coins, skill.unbreakable, 0, random.Random(1))
+    assert len(flip.trail) < 500
+
+    session = ClashSession(
+        session_id="s", kind=LIMBUS, user_id=1, user_name="A" * 32, channel_id=1,
+        skill=("Slash", 3, 2, 50, 25), sanity=0, live=False, expires_at=0.0
+    )
+    user2 = SimpleNamespace(display_name="B" * 32, mention="<@2>")
+    random.seed(1)
+    blocks = render_clash(session, user2, ("Pierce", 4, 1, 50, 25), 0)
+    pages = paginate(blocks)
+    assert all(len(page) + len(f"\n\n*Page {len(pages)}/{len(pages)}*") <= MESSAGE_LIMIT for page in pages)
+    assert CLASH_PAGE_LIMIT < MESSAGE_LIMIT
+
+
+def test_parse_skill_refs():
+    assert parse_skill_refs(" ALL ", 5) is None
+    assert parse_skill_refs("Slash:10, 3:-5, Guard, 7, Odd:name:x,,", 5) == [
+        ("Slash", 10), (3, -5), ("Guard", 5), (7, 5), ("Odd:name:x", 5)
+    ]
+    assert parse_skill_refs("Slash:99, Guard:-99", 0) == [("Slash", 45), ("Guard", -45)]
+
+
+def test_tie_only_clash_renders_a_stalemate():
+    session = ClashSession(
+        session_id="s", kind=LIMBUS, user_id=1, user_name="A", channel_id=1,
+        skill=("Guard", 4, 0, 3, 0), sanity=0, live=False, expires_at=0.0
+    )
+    user2 = SimpleNamespace(display_name="B", mention="<@2>")
+    blocks = render_clash(session, user2, ("Guard", 4, 0, 3, 0), 0)
+    assert blocks[-1].startswith("🤝 **Stalemate!**")
+    assert not any("🏆" in block for block in blocks)
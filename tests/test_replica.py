@@ -0,0 +1,40 @@
+from replica import SkillReplica
+
+
+def row(user_skill_id, name):
+    return {"user_skill_id": user_skill_id, "skill_name": name}
+
+
+def test_rows_only_for_replicated_users():
+    replica = SkillReplica(":memory:")
+    replica.add_row("u", "t", row(1, "A"))
+    assert replica.rows("u", "t") is None
+
+    replica.store("u", "t", [row(2, "B"), row(1, "A")])
+    replica.add_row("u", "t", row(3, "C"))
+    replica.remove_row("u", "t", 1)
+    assert replica.rows("u", "t") == [row(2, "B"), row(3, "C")]
+    assert replica.rows("u", "other") is None
+
+
+def test_queued_writes_block_refreshes_and_pruning():
+    replica = SkillReplica(":memory:")
+    replica.store("u", "t", [row(1, "A")])
+    replica.store("v", "t", [])
+    replica.queue("u", "t", "insert", [{"skill_name": "B"}])
+    replica.queue("u", "t", "delete", ["A"])
+
+    assert replica.has_pending("u", "t") and not replica.has_pending("v", "t")
+    replica.store("u", "t", [])
+    assert replica.rows("u", "t") == [row(1, "A")]
+
+    assert replica.prune(0) == 1
+    assert replica.rows("u", "t") is not None and replica.rows("v", "t") is None
+
+    writes = replica.pending()
+    assert [(user_id, op, payload) for _, user_id, _, op, payload in writes] == [
+        ("u", "insert", [{"skill_name": "B"}]), ("u", "delete", ["A"])
+    ]
+    for write_id, *_ in writes:
+        replica.done(write_id)
+    assert replica.pending_count() == 0 and not replica.has_pending("u", "t")
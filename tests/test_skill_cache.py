@@ -0,0 +1,57 @@
+from skill_cache import SkillCache, UserSkills
+
+
+def row(user_skill_id, name):
+    return {"user_skill_id": user_skill_id, "skill_name": name}
+
+
+def test_find_ignores_case_and_prefers_lowest_id():
+    skills = UserSkills([row(1, "Slash"), row(2, "slash"), row(3, "Guard")], expires_at=0.0)
+    assert skills.find("SLASH")["user_skill_id"] == 1
+    assert skills.find(skill_id=3)["skill_name"] == "Guard"
+    assert skills.find() is None
+
+    skills.remove(row(1, "Slash"))
+    assert skills.find("slash")["user_skill_id"] == 2
+    assert [r["user_skill_id"] for r in skills.rows()] == [2, 3]
+
+
+def test_suggest_lists_prefixes_before_substrings():
+    skills = UserSkills([row(1, "Upper Slash"), row(2, "Slash"), row(3, "Slam"), row(4, "Guard")], 0.0)
+    assert skills.suggest("sl") == ["Slam", "Slash", "Upper Slash"]
+    assert skills.suggest("sl", limit=1) == ["Slam"]
+
+    # The sorted index follows later writes
+    skills.add(row(5, "Sledge"))
+    skills.remove(row(3, "Slam"))
+    assert skills.suggest("SL") == ["Slash", "Sledge", "Upper Slash"]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = SkillCache(max_entries=2, ttl=60)
+    cache.put("a", "t", [row(1, "A")])
+    cache.put("b", "t", [row(1, "B")])
+    assert cache.get("a", "t") is not None
+    cache.put("c", "t", [row(1, "C")])
+
+    assert ("b", "t") not in cache
+    assert ("a", "t") in cache and ("c", "t") in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_expires_and_only_writes_through_to_cached_users():
+    cache = SkillCache(ttl=0)
+    cache.put("a", "t", [row(1, "A")])
+    assert cache.get("a", "t") is None
+    assert cache.stats()["misses"] == 1
+
+    cache.ttl = 60
+    cache.add_row("a", "t", row(2, "B"))
+    assert cache.get("a", "t") is None
+    cache.put("a", "t", [row(1, "A")])
+    cache.add_row("a", "t", row(2, "B"))
+    cache.remove_row("a", "t", row(1, "A"))
+    assert [r["skill_name"] for r in cache.get("a", "t").rows()] == ["B"]
+
+    cache.invalidate("a", "t")
+    assert ("a", "t") not in cache
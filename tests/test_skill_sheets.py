@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from clash_engine import MAX_COINS
+from skill_sheets import MAX_SHEET_BYTES, SheetError, read_sheet, validate_sheet, write_sheet
+from storage import SKILLS_TABLE, TTRPG_SKILLS_TABLE
+
+
+def problems(rows, table=SKILLS_TABLE):
+    with pytest.raises(SheetError) as e:
+        validate_sheet(rows, table)
+    return e.value.problems
+
+
+def test_csv_and_json_round_trip():
+    rows = [
+        {"user_skill_id": 1, "skill_name": "Slash", "base_power": 3, "coin_power": 2, "coins": 3, "unbreakable": 1},
+        {"user_skill_id": 2, "skill_name": "Guard, Heavy", "base_power": 5, "coin_power": -1, "coins": 1,
+         "unbreakable": 0},
+    ]
+    expected = [{k: v for k, v in r.items() if k != "user_skill_id"} for r in rows]
+    for fmt, filename in (("csv", "skills.csv"), ("json", "skills.JSON")):
+        data = write_sheet(rows, SKILLS_TABLE, fmt)
+        assert validate_sheet(read_sheet(filename, data), SKILLS_TABLE) == expected
+
+
+def test_unreadable_sheets():
+    for filename, data in (("s.txt", b"x"), ("s.csv", b"\xff\xfe\x00"), ("s.json", b"{"),
+                           ("s.json", b'{"skill_name": "A"}'), ("s.csv", b"x" * (MAX_SHEET_BYTES + 1))):
+        with pytest.raises(SheetError):
+            read_sheet(filename, data)
+
+
+def test_every_bad_row_is_reported():
+    rows = [
+        {"skill_name": "A", "base_power": "3", "coin_power": "2", "coins": "3"},
+        {"skill_name": "a", "base_power": 3, "coin_power": 2, "coins": 3},
+        {"skill_name": "B", "base_power": "x", "coin_power": 2},
+        {"skill_name": "C", "base_power": 1, "coin_power": 1, "coins": MAX_COINS + 1},
+        {"skill_name": "D", "base_power": 1, "coin_power": 1, "coins": 2, "unbreakable": 3},
+        {"skill_name": "E", "base_power": True, "coin_power": 1, "coins": 1},
+    ]
+    assert problems(rows) == [
+        "Row 2: `a` appears more than once.",
+        "Row 3: `base_power` must be a whole number.",
+        "Row 3: missing `coins`.",
+        f"Row 4: `coins` must be between 0 and {MAX_COINS}.",
+        "Row 5: `unbreakable` must be between 0 and `coins`.",
+        "Row 6: `base_power` must be a whole number.",
+    ]
+    assert problems([]) == ["The sheet has no skills."]
+
+
+def test_ttrpg_sheets():
+    data = json.dumps([{"skill_slot": 1, "skill_name": "Bolt", "base_power": 2, "dice_power": -8}]).encode()
+    assert validate_sheet(read_sheet("s.json", data), TTRPG_SKILLS_TABLE) == [
+        {"skill_slot": 1, "skill_name": "Bolt", "base_power": 2, "dice_power": -8}
+    ]
+    assert problems([{"skill_slot": 1, "skill_name": "Bolt", "base_power": 2, "dice_power": 5000}],
+                    TTRPG_SKILLS_TABLE)[0].startswith("Row 1: `dice_power` must be between")
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+import storage
+from storage import SKILLS_TABLE
+
+
+def skill_names(db, user_id="u"):
+    return sorted(r["skill_name"] for r in db.tables.get(SKILLS_TABLE, []) if r["user_id"] == user_id)
+
+
+# PostgREST reads `*` as a wildcard; the fake has to as well, or it hides that
+def test_fake_ilike_treats_star_as_wildcard(db):
+    async def run():
+        await storage.save_skill("u", "Slash", 1, 1, 1, 0)
+        await storage.save_skill("u", "Slash II", 1, 1, 1, 0)
+        query = db.table(SKILLS_TABLE).select("skill_name").ilike("skill_name", "slash*")
+        return [r["skill_name"] for r in (await query.execute()).data]
+
+    assert sorted(asyncio.run(run())) == ["Slash", "Slash II"]
+
+
+def test_delete_by_name_is_literal(db):
+    async def run():
+        for name in ("Slash", "Slash II", "Slash_"):
+            await storage.save_skill("u", name, 1, 1, 1, 0)
+        assert await storage.delete_skill("u", skill_name="Slash*") is None
+        assert await storage.delete_skill("u", skill_name="Slash%") is None
+        assert skill_names(db) == ["Slash", "Slash II", "Slash_"]
+
+        await storage.save_skill("u", "Slash*", 1, 1, 1, 0)
+        assert await storage.delete_skill("u", skill_name="slash*") == "Slash*"
+        assert await storage.delete_skill("u", skill_name="SLASH") == "Slash"
+        assert skill_names(db) == ["Slash II", "Slash_"]
+
+    asyncio.run(run())
+
+
+# Supabase reads the rows straight away but answers only once `release` is set
+def late_reads(monkeypatch):
+    import loadtest
+    release = asyncio.Event()
+    original = loadtest.FakeQuery.execute
+
+    async def execute(query):
+        result = await original(query)
+        if query.action == "select":
+            await release.wait()
+        return result
+
+    monkeypatch.setattr(loadtest.FakeQuery, "execute", execute)
+    return release
+
+
+def test_load_in_flight_during_writes_is_not_cached(db, monkeypatch):
+    async def run():
+        await storage.save_skill("u", "A", 1, 1, 1, 0)
+        release = late_reads(monkeypatch)
+        load = asyncio.create_task(storage.load_skill("u", "A"))
+        await asyncio.sleep(0.01)
+
+        assert await storage.save_skill("u", "B", 1, 1, 1, 0) == 2
+        release.set()
+        assert (await load)[0] == "A"
+        assert (await storage.load_skill("u", skill_id=2))[0] == "B"
+
+        release.clear()
+        storage.skill_cache.invalidate("u", SKILLS_TABLE)
+        load = asyncio.create_task(storage.load_skill("u", "A"))
+        await asyncio.sleep(0.01)
+        assert await storage.delete_skill("u", skill_id=1) == "A"
+        release.set()
+        await load
+        assert await storage.load_skill("u", "A") is None
+        assert [r["skill_name"] for r in storage.replica.rows("u", SKILLS_TABLE)] == ["B"]
+
+    asyncio.run(run())
+
+
+def test_outage_writes_queue_and_replay_in_order(db):
+    async def run():
+        await storage.save_skill("u", "A", 1, 1, 1, 0)
+        await storage.load_skill("u", "A")
+
+        db.down = True
+        assert await storage.save_skill("u", "B", 1, 1, 1, 0) == 2
+        db.down = False
+        # Queued behind B even though Supabase is back
+        assert await storage.delete_skill("u", skill_name="a") == "A"
+        assert await storage.save_skill("u", "C", 1, 1, 1, 0) == 3
+        assert skill_names(db) == ["A"]
+        assert storage.replica.pending_count() == 3
+
+        assert await storage.replay_pending_writes() == 3
+        assert skill_names(db) == ["B", "C"]
+        assert storage.replica.pending_count() == 0
+        assert [r["skill_name"] for r in (await storage.load_user_skills("u", SKILLS_TABLE)).rows()] == ["B", "C"]
+
+    asyncio.run(run())
+
+
+def test_outage_without_a_replica_is_reported(db):
+    db.down = True
+    with pytest.raises(storage.SupabaseUnavailable):
+        asyncio.run(storage.save_skill("u", "A", 1, 1, 1, 0))